@@ -1,10 +1,13 @@
-import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict
+from typing import List, Dict, Optional
+import asyncio
 import os
 from dotenv import load_dotenv
-from twilio.rest import Client
+
+from alerts.smtp_pool import SmtpPool
+from monitoring.metrics import stage
 
 load_dotenv()
 
@@ -15,27 +18,36 @@ class Notifier:
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.smtp_username = os.getenv('SMTP_USERNAME')
         self.smtp_password = os.getenv('SMTP_PASSWORD')
+        self.smtp = SmtpPool(self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password)
+
+        # SMTP and Twilio clients are blocking, so deliveries run on these threads
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('NOTIFIER_WORKERS', '4')),
+            thread_name_prefix='notifier'
+        )
         
         # Twilio configuration
         self.twilio_account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.twilio_auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.twilio_from_number = os.getenv('TWILIO_FROM_NUMBER')
-        
-        if self.twilio_account_sid and self.twilio_auth_token:
-            self.twilio_client = Client(self.twilio_account_sid, self.twilio_auth_token)
-        else:
-            self.twilio_client = None
+        self._twilio_client = None
+
+        # Recipients for alerts that were recorded without their own
+        self.default_email = os.getenv('ALERT_EMAIL_TO')
+        self.default_phone = os.getenv('ALERT_PHONE_TO')
+
+    @property
+    def twilio_client(self):
+        """Twilio client, or None without credentials; twilio is imported on first use."""
+        if self._twilio_client is None and self.twilio_account_sid and self.twilio_auth_token:
+            from twilio.rest import Client
+            self._twilio_client = Client(self.twilio_account_sid, self.twilio_auth_token)
+        return self._twilio_client
 
     async def send_email_alert(self, to_email: str, product_name: str, 
                              current_price: float, threshold: float, url: str) -> bool:
         """Send price alert via email."""
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = f'Price Alert: {product_name}'
-
-            body = f"""Hello!
+        body = f"""Hello!
 
 Great news! The price of {product_name} has dropped below your alert threshold.
 
@@ -47,12 +59,18 @@ View the product here: {url}
 Best regards,
 Smart Price Tracker"""
 
+        return await self._deliver_email(to_email, f'Price Alert: {product_name}', body)
+
+    async def _deliver_email(self, to_email: str, subject: str, body: str) -> bool:
+        try:
+            msg = MIMEMultipart()
+            msg['From'] = self.smtp_username
+            msg['To'] = to_email
+            msg['Subject'] = subject
             msg.attach(MIMEText(body, 'plain'))
 
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            with stage('alert.email'):
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.smtp.send, msg)
 
             return True
 
@@ -66,14 +84,23 @@ Smart Price Tracker"""
         if not self.twilio_client:
             return False
 
-        try:
-            message = f"Price Alert: {product_name} is now ${current_price:.2f} (below your threshold of ${threshold:.2f})"
+        message = f"Price Alert: {product_name} is now ${current_price:.2f} (below your threshold of ${threshold:.2f})"
+        return await self._deliver_sms(to_number, message)
 
-            self.twilio_client.messages.create(
-                body=message,
-                from_=self.twilio_from_number,
-                to=to_number
-            )
+    async def _deliver_sms(self, to_number: str, message: str) -> bool:
+        if not self.twilio_client:
+            return False
+
+        try:
+            with stage('alert.sms'):
+                await asyncio.get_running_loop().run_in_executor(
+                    self.executor,
+                    lambda: self.twilio_client.messages.create(
+                        body=message,
+                        from_=self.twilio_from_number,
+                        to=to_number
+                    )
+                )
 
             return True
 
@@ -104,4 +131,51 @@ Smart Price Tracker"""
             )
             success = success or sms_success
 
-        return success
\ No newline at end of file
+        return success
+
+    async def send_digest(self, alerts: List[Dict], email: Optional[str] = None,
+                          phone: Optional[str] = None) -> bool:
+        """Send several alerts for one recipient as a single message per channel.
+
+        Each alert has `name`, `price`, `threshold` and `url`. Returns True if
+        any channel delivered.
+        """
+        if len(alerts) == 1:
+            alert = alerts[0]
+            alert_data = {'product_name': alert['name'], 'current_price': alert['price'],
+                          'threshold': alert['threshold'], 'url': alert['url']}
+            if email:
+                alert_data['email'] = email
+            if phone:
+                alert_data['phone'] = phone
+            return await self.send_alert(alert_data)
+
+        success = False
+        if email:
+            lines = "\n".join(
+                f"- {alert['name']}: ${alert['price']:.2f} (threshold ${alert['threshold']:.2f})\n  {alert['url']}"
+                for alert in alerts
+            )
+            body = f"""Hello!
+
+{len(alerts)} of your tracked products dropped below your alert thresholds:
+
+{lines}
+
+Best regards,
+Smart Price Tracker"""
+            success = await self._deliver_email(email, f'Price Alerts: {len(alerts)} products', body) or success
+
+        if phone:
+            names = ", ".join(f"{alert['name']} ${alert['price']:.2f}" for alert in alerts)
+            success = await self._deliver_sms(phone, f"Price Alerts: {names}") or success
+
+        return success
+
+    def stats(self) -> Dict:
+        return {'smtp': self.smtp.stats()}
+
+    def close(self) -> None:
+        """Finish queued deliveries and close pooled SMTP connections."""
+        self.executor.shutdown(wait=True)
+        self.smtp.close()
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
+import socket
+import time
+
+from alerts.notifier import Notifier
+from database.db import Database
+
+
+class AlertOutbox:
+    """Background delivery of alerts recorded with Database.add_alert.
+
+    Pending alerts are read in batches and grouped per recipient, so several
+    alerts for the same person go out as one digest. Delivered alerts are
+    marked notified with one bulk update; failed deliveries are retried with
+    exponential backoff and given up on after `max_attempts`. Batches are
+    claimed with Database.claim_alerts first, so every API process can run
+    an outbox without sending an alert twice.
+    """
+
+    def __init__(self, db: Database, notifier: Notifier, batch_size: Optional[int] = None,
+                 poll_seconds: Optional[float] = None, max_attempts: Optional[int] = None,
+                 backoff_seconds: Optional[float] = None, claim_lease: Optional[timedelta] = None):
+        self.db = db
+        self.notifier = notifier
+        self.batch_size = batch_size or int(os.getenv('ALERT_BATCH_SIZE', '100'))
+        self.poll_seconds = poll_seconds or float(os.getenv('ALERT_POLL_SECONDS', '5'))
+        self.max_attempts = max_attempts or int(os.getenv('ALERT_MAX_ATTEMPTS', '5'))
+        self.backoff_seconds = backoff_seconds or float(os.getenv('ALERT_BACKOFF_SECONDS', '30'))
+        self.claim_lease = claim_lease or timedelta(seconds=int(os.getenv('ALERT_CLAIM_SECONDS', '300')))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {'batches': 0, 'delivered': 0, 'digests': 0, 'retried': 0, 'failed': 0, 'busy_seconds': 0.0}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Deliver new alerts now instead of at the next poll."""
+        self._wake.set()
+
+    def recipients(self, alert: Dict) -> Tuple[Optional[str], Optional[str]]:
+        return (alert.get('email') or self.notifier.default_email,
+                alert.get('phone') or self.notifier.default_phone)
+
+    async def drain_once(self) -> int:
+        """Deliver one batch of due alerts; returns how many alerts it handled."""
+        alerts = await self.db.claim_alerts(self.owner, self.batch_size, self.claim_lease)
+        if not alerts:
+            return 0
+
+        started = time.perf_counter()
+        groups: Dict[Tuple, List[Dict]] = defaultdict(list)
+        for alert in alerts:
+            groups[self.recipients(alert)].append(alert)
+
+        outcomes = await asyncio.gather(*(self._deliver(recipient, group) for recipient, group in groups.items()))
+
+        delivered = [alert['_id'] for ok, group in zip(outcomes, groups.values()) if ok for alert in group]
+        await self.db.mark_alerts_notified(delivered)
+        for ok, (recipient, group) in zip(outcomes, groups.items()):
+            if not ok:
+                await self._retry(recipient, group)
+
+        self._stats['batches'] += 1
+        self._stats['digests'] += sum(1 for ok, group in zip(outcomes, groups.values()) if ok and len(group) > 1)
+        self._stats['delivered'] += len(delivered)
+        self._stats['busy_seconds'] += time.perf_counter() - started
+        return len(alerts)
+
+    async def _deliver(self, recipient: Tuple[Optional[str], Optional[str]], group: List[Dict]) -> bool:
+        email, phone = recipient
+        if not email and not phone:
+            return False
+        messages = [{**alert, 'name': alert.get('name') or alert['url']} for alert in group]
+        return await self.notifier.send_digest(messages, email=email, phone=phone)
+
+    async def _retry(self, recipient: Tuple[Optional[str], Optional[str]], group: List[Dict]) -> None:
+        if not any(recipient):
+            # Nowhere to send these; retrying will not help
+            await self.db.retry_alerts([alert['_id'] for alert in group], None, 'no recipient')
+            self._stats['failed'] += len(group)
+            return
+
+        retry, give_up = [], []
+        for alert in group:
+            (give_up if alert.get('attempts', 0) + 1 >= self.max_attempts else retry).append(alert)
+
+        if retry:
+            attempts = max(alert.get('attempts', 0) for alert in retry)
+            delay = timedelta(seconds=self.backoff_seconds * 2 ** attempts)
+            await self.db.retry_alerts([alert['_id'] for alert in retry], datetime.utcnow() + delay, 'delivery failed')
+            self._stats['retried'] += len(retry)
+        if give_up:
+            await self.db.retry_alerts([alert['_id'] for alert in give_up], None, 'delivery failed')
+            self._stats['failed'] += len(give_up)
+
+    def stats(self) -> Dict:
+        busy = self._stats['busy_seconds']
+        return {
+            **self._stats,
+            'alerts_per_sec': self._stats['delivered'] / busy if busy > 0 else 0.0
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Keep draining while full batches come back
+                while await self.drain_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"❌ Alert outbox error: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
@@ -0,0 +1,100 @@
+from email.message import Message
+from typing import Dict, Optional
+import queue
+import smtplib
+import threading
+import time
+import os
+
+
+class SmtpPool:
+    """Bounded pool of persistent, logged-in SMTP connections.
+
+    Connections are opened lazily, reused across messages and re-opened when
+    the server has dropped them, so a burst of alerts costs at most `size`
+    TLS handshakes. Blocking; call send() from a worker thread.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str], password: Optional[str],
+                 size: Optional[int] = None, max_idle: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size or int(os.getenv('SMTP_POOL_SIZE', '2'))
+        # Connections idle longer than this are checked with NOOP before reuse
+        self.max_idle = max_idle if max_idle is not None else float(os.getenv('SMTP_MAX_IDLE_SECONDS', '60'))
+
+        self._idle: 'queue.LifoQueue' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._stats = {'sent': 0, 'failed': 0, 'connects': 0, 'reconnects': 0}
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self._count('connects')
+        return server
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _checkout(self) -> smtplib.SMTP:
+        try:
+            server, idle_since = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+        if time.monotonic() - idle_since > self.max_idle:
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            self._discard(server)
+            self._count('reconnects')
+            return self._connect()
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def send(self, message: Message) -> None:
+        """Send `message` on a pooled connection, reconnecting once if it was dropped."""
+        with self._slots:
+            server = None
+            try:
+                server = self._checkout()
+                try:
+                    server.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    self._count('reconnects')
+                    server = self._connect()
+                    server.send_message(message)
+            except Exception:
+                self._count('failed')
+                if server is not None:
+                    self._discard(server)
+                raise
+
+            self._count('sent')
+            self._idle.put((server, time.monotonic()))
+
+    def close(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, 'idle': self._idle.qsize(), 'size': self.size}
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+import mongomock_motor
+from datetime import datetime
+from alerts.outbox import AlertOutbox
+
+class FakeDB:
+    def __init__(self, alerts):
+        self.alerts = {alert['_id']: {'attempts': 0, 'notified': False, **alert} for alert in alerts}
+        self.bulk_updates = 0
+
+    async def get_pending_alerts(self, limit=0, due=None):
+        pending = [a for a in self.alerts.values()
+                   if not a['notified'] and not a.get('failed') and (due is None or a.get('next_attempt_at', due) <= due)]
+        return pending[:limit or None]
+
+    async def claim_alerts(self, owner, limit, lease):
+        return await self.get_pending_alerts(limit, datetime.utcnow())
+
+    async def mark_alerts_notified(self, ids):
+        self.bulk_updates += 1
+        for alert_id in ids:
+            self.alerts[alert_id]['notified'] = True
+
+    async def retry_alerts(self, ids, next_attempt_at, error):
+        for alert_id in ids:
+            alert = self.alerts[alert_id]
+            alert['attempts'] += 1
+            if next_attempt_at is None:
+                alert['failed'] = True
+            else:
+                alert['next_attempt_at'] = next_attempt_at
+
+class FakeNotifier:
+    default_email = 'default@example.com'
+    default_phone = None
+
+    def __init__(self, fail=()):
+        self.sent = []
+        self.fail = set(fail)
+
+    async def send_digest(self, alerts, email=None, phone=None):
+        if email in self.fail:
+            return False
+        self.sent.append((email, [alert['url'] for alert in alerts]))
+        return True
+
+def alert(alert_id, email=None):
+    return {'_id': alert_id, 'url': f'https://example.com/{alert_id}', 'price': 10, 'threshold': 20, 'email': email}
+
+def test_alerts_are_coalesced_per_recipient():
+    db = FakeDB([alert(1, 'a@x'), alert(2, 'a@x'), alert(3), alert(4, 'b@x')])
+    notifier = FakeNotifier()
+    outbox = AlertOutbox(db, notifier, batch_size=10)
+
+    assert asyncio.run(outbox.drain_once()) == 4
+    assert sorted((email, len(urls)) for email, urls in notifier.sent) == [
+        ('a@x', 2), ('b@x', 1), ('default@example.com', 1)
+    ]
+    assert db.bulk_updates == 1
+    assert all(a['notified'] for a in db.alerts.values())
+    assert outbox.stats()['digests'] == 1
+
+def test_failed_delivery_backs_off_then_gives_up():
+    db = FakeDB([alert(1, 'down@x')])
+    outbox = AlertOutbox(db, FakeNotifier(fail={'down@x'}), max_attempts=2, backoff_seconds=60)
+
+    asyncio.run(outbox.drain_once())
+    assert db.alerts[1]['attempts'] == 1
+    assert db.alerts[1]['next_attempt_at'] > datetime.utcnow()
+    assert asyncio.run(outbox.drain_once()) == 0  # not due yet
+
+    db.alerts[1]['next_attempt_at'] = datetime.utcnow()
+    asyncio.run(outbox.drain_once())
+    assert db.alerts[1]['failed'] and not db.alerts[1]['notified']
+
+def test_outboxes_in_two_processes_deliver_each_alert_once():
+    from database.db import Database
+    db = Database(client=mongomock_motor.AsyncMongoMockClient())
+    notifier = FakeNotifier()
+    outboxes = [AlertOutbox(db, notifier, batch_size=10) for _ in range(2)]
+    outboxes[1].owner = 'other-process'
+
+    async def run():
+        for i in range(6):
+            await db.add_alert(f'https://example.com/{i}', 10, 20, email=f'{i}@x')
+        # Recorded before retries existed: no attempts or next_attempt_at
+        await db.alerts.insert_one({'url': 'https://example.com/old', 'price': 10, 'threshold': 20,
+                                    'email': 'old@x', 'timestamp': datetime.utcnow(), 'notified': False})
+        # Claimed by a process that died
+        await db.add_alert('https://example.com/stuck', 10, 20, email='stuck@x')
+        await db.alerts.update_one({'url': 'https://example.com/stuck'},
+                                   {'$set': {'claimed_by': 'dead', 'claim_expires': datetime.utcnow()}})
+        handled = await asyncio.gather(*(outbox.drain_once() for outbox in outboxes))
+        return handled, await db.alerts.count_documents({'notified': False})
+
+    handled, pending = asyncio.run(run())
+    assert sum(handled) == 8
+    assert sorted(urls[0] for _, urls in notifier.sent) == sorted(
+        [f'https://example.com/{i}' for i in range(6)] + ['https://example.com/old', 'https://example.com/stuck'])
+    assert pending == 0
@@ -0,0 +1,45 @@
+import smtplib
+from email.mime.text import MIMEText
+from alerts.smtp_pool import SmtpPool
+
+class FakeServer:
+    def __init__(self):
+        self.sent = []
+        self.drop = False
+
+    def send_message(self, message):
+        if self.drop:
+            raise smtplib.SMTPServerDisconnected()
+        self.sent.append(message)
+
+    def noop(self):
+        return (250, b'OK')
+
+    def quit(self):
+        pass
+
+class FakePool(SmtpPool):
+    def __init__(self, **kwargs):
+        super().__init__('localhost', 25, None, None, **kwargs)
+        self.servers = []
+
+    def _connect(self):
+        self._count('connects')
+        self.servers.append(FakeServer())
+        return self.servers[-1]
+
+def test_connection_is_reused():
+    pool = FakePool(size=2)
+    for _ in range(5):
+        pool.send(MIMEText('hi'))
+    assert len(pool.servers) == 1
+    assert pool.stats()['sent'] == 5
+
+def test_reconnects_after_disconnect():
+    pool = FakePool(size=1)
+    pool.send(MIMEText('one'))
+    pool.servers[0].drop = True
+    pool.send(MIMEText('two'))
+    assert len(pool.servers) == 2
+    assert len(pool.servers[1].sent) == 1
+    assert pool.stats()['reconnects'] == 1
@@ -0,0 +1,116 @@
+"""Offline benchmark suite for the scrape, parse, forecast and database hot paths.
+
+Scrapers run against the stand-in pages in scraper/fixtures/ (also padded
+to a real page's size) or, with --pages, a directory of saved product
+pages, served from a local HTTP server; the predictor runs against
+synthetic histories, and the
+database against MONGO_URI (a throwaway MONGO_BENCH_DB database) or, with
+--in-memory, mongomock-motor. Results are JSON; pass a previous run to
+--compare to report regressions. Run from the backend directory:
+
+    python -m benchmarks --output bench.json
+    python -m benchmarks --suite predict --compare bench.json
+"""
+from datetime import datetime
+from typing import Dict
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+
+SUITES = ('parse', 'scrape', 'predict', 'db')
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def flatten(results: Dict) -> Dict[str, float]:
+    """Map 'suite/benchmark' to its p50 latency."""
+    return {
+        f'{suite}/{name}': result['p50_ms']
+        for suite, benchmarks in results.items()
+        for name, result in benchmarks.items()
+        if isinstance(result, dict) and 'p50_ms' in result
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> bool:
+    """Print p50 changes against a baseline run; returns True if anything regressed."""
+    before, after = flatten(baseline['results']), flatten(current['results'])
+    regressed = False
+    print(f"{'benchmark':<44} {'base ms':>10} {'now ms':>10} {'change':>8}")
+    for name in sorted(before.keys() & after.keys()):
+        change = (after[name] - before[name]) / before[name] * 100 if before[name] else 0.0
+        flag = ''
+        if change > tolerance:
+            flag = '  REGRESSION'
+            regressed = True
+        print(f"{name:<44} {before[name]:>10.3f} {after[name]:>10.3f} {change:>+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suite', action='append', choices=SUITES, help='suites to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per benchmark')
+    parser.add_argument('--browser', action='store_true', help='also scrape the pages in Chromium')
+    parser.add_argument('--pages', help='directory of saved amazon_*.html / flipkart_*.html pages to use '
+                                        'instead of the stand-in fixtures')
+    parser.add_argument('--sizes', type=int, nargs='+', help='history sizes for the predict suite')
+    parser.add_argument('--prophet-max', type=int, default=1000, help='largest history to fit with Prophet')
+    parser.add_argument('--in-memory', action='store_true', help='run the db suite on mongomock-motor')
+    parser.add_argument('--products', type=int, default=100, help='products in the db suite')
+    parser.add_argument('--checks', type=int, default=50, help='price checks per product before timing')
+    parser.add_argument('--output', help='write results to this JSON file instead of stdout')
+    parser.add_argument('--compare', help='previous results to compare p50 latencies against')
+    parser.add_argument('--tolerance', type=float, default=20, help='allowed p50 slowdown in percent')
+    args = parser.parse_args()
+
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    suites = args.suite or SUITES
+    results = {}
+
+    if 'parse' in suites or 'scrape' in suites:
+        from benchmarks import bench_scrape
+        scrape_results = bench_scrape.run(args.repeat, args.browser, args.pages)
+        results.update({suite: scrape_results[suite] for suite in ('parse', 'scrape') if suite in suites})
+    if 'predict' in suites:
+        from benchmarks import bench_predict
+        results['predict'] = bench_predict.run(args.repeat, args.sizes or bench_predict.SIZES, args.prophet_max)
+    if 'db' in suites:
+        from benchmarks import bench_db
+        results['db'] = bench_db.run(args.repeat, args.in_memory, args.products, args.checks)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Database hot paths against a local mongod or an in-memory stand-in."""
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Dict, Optional
+import asyncio
+import os
+
+import numpy as np
+
+from benchmarks.timing import measure_async
+from database.db import Database
+from database.history import PriceSeries, runs_to_series
+from scraper.canonical import product_key
+
+_EPOCH = datetime(1970, 1, 1)
+_MS = timedelta(milliseconds=1)
+
+
+def connect(in_memory: bool) -> Optional[Database]:
+    """A Database on a throwaway database, or None if no backend is available."""
+    db_name = os.getenv('MONGO_BENCH_DB', 'price_tracker_bench')
+    if not in_memory:
+        return Database(db_name=db_name)
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        return None
+    return Database(client=AsyncMongoMockClient(), db_name=db_name)
+
+
+async def _timed(fn, repeat: int) -> Dict:
+    try:
+        return await measure_async(fn, repeat)
+    except Exception as e:
+        # e.g. an operator the in-memory stand-in does not implement
+        return {'error': f"{type(e).__name__}: {e}"}
+
+
+async def series_client_side(db: Database, url: str) -> PriceSeries:
+    """get_price_series with dates converted here rather than by the server's $toLong."""
+    runs = await db.price_history.find(
+        {'key': product_key(url)}, {'_id': 0, 'timestamp': 1, 'last_seen': 1, 'price': 1}
+    ).sort('timestamp', 1).to_list(length=None)
+    return runs_to_series(
+        np.fromiter(((run['timestamp'] - _EPOCH) // _MS for run in runs), np.int64, len(runs)),
+        np.fromiter(((run.get('last_seen', run['timestamp']) - _EPOCH) // _MS for run in runs), np.int64, len(runs)),
+        np.fromiter((run['price'] for run in runs), np.float32, len(runs))
+    )
+
+
+async def run_async(db: Database, repeat: int, products: int = 100, checks: int = 50,
+                    in_memory: bool = False) -> Dict[str, Dict]:
+    urls = [f'https://www.amazon.in/dp/B{index:09d}' for index in range(products)]
+    prices = count()
+
+    def next_price() -> float:
+        # Changes every other check, so history holds both new runs and extended ones
+        return 100 + (next(prices) // 2) % 7
+
+    await db.ensure_indexes()
+    for url in urls:
+        await db.add_tracked_product(url, 'Benchmark product', 50, 100)
+    for _ in range(checks):
+        await db.update_prices_bulk([{'url': url, 'price': next_price()} for url in urls])
+
+    url_cycle = iter(urls * (repeat + 1))
+    results = {
+        'update_price': await _timed(lambda: db.update_price(next(url_cycle), next_price()), repeat),
+        f'update_prices_bulk/{products}': await _timed(
+            lambda: db.update_prices_bulk([{'url': url, 'price': next_price()} for url in urls]), repeat
+        ),
+        'get_price_history': await _timed(lambda: db.get_price_history(urls[0]), repeat),
+        'get_price_history/daily': await _timed(lambda: db.get_price_history(urls[0], timedelta(days=1)), repeat),
+        'get_price_series/client_side': await _timed(lambda: series_client_side(db, urls[0]), repeat),
+        'get_price_history_page/20': await _timed(lambda: db.get_price_history_page(urls[0], limit=20), repeat),
+        f'get_price_histories/{products}': await _timed(lambda: db.get_price_histories(urls), repeat),
+        f'get_products/{products}': await _timed(lambda: db.get_products(urls), repeat),
+        'get_products_to_check': await _timed(lambda: db.get_products_to_check(), repeat),
+        'get_product_stats': await _timed(lambda: db.get_product_stats(urls[0]), repeat),
+    }
+    if in_memory:
+        # The columnar conversion still runs, in series_client_side
+        results['get_price_series'] = {'skipped': 'mongomock-motor has no $toLong on dates'}
+    else:
+        results['get_price_series'] = await _timed(lambda: db.get_price_series(urls[0]), repeat)
+    results['setup'] = {'products': products, 'checks': checks}
+    return results
+
+
+def run(repeat: int, in_memory: bool = False, products: int = 100, checks: int = 50) -> Dict[str, Dict]:
+    db = connect(in_memory)
+    if db is None:
+        return {'skipped': 'no MONGO_URI given and mongomock-motor is not installed'}
+
+    async def main():
+        try:
+            return await run_async(db, repeat, products, checks, in_memory)
+        finally:
+            await db.client.drop_database(db.db.name)
+
+    return asyncio.run(main())
@@ -0,0 +1,37 @@
+"""PricePredictor on synthetic step-shaped histories of increasing length."""
+from typing import Dict, Iterable
+import numpy as np
+
+from benchmarks.timing import measure
+from database.history import PriceSeries
+from predictor.backtest import generate_step_series
+from predictor.predict import PricePredictor
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+
+
+def to_series(history) -> PriceSeries:
+    epoch = np.datetime64('1970-01-01T00:00:00', 'ms')
+    dates = np.array([point['date'] for point in history], dtype='datetime64[ms]')
+    return PriceSeries((dates - epoch).astype(np.int64), [point['price'] for point in history])
+
+
+def run(repeat: int, sizes: Iterable[int] = SIZES, prophet_max: int = 1_000, seed: int = 0) -> Dict[str, Dict]:
+    """Time predict_prices per history size and mode.
+
+    Prophet fits grow much slower with size, so they stop at `prophet_max`
+    points.
+    """
+    rng = np.random.default_rng(seed)
+    predictor = PricePredictor()
+    results = {}
+    for size in sizes:
+        history = generate_step_series(size, rng)
+        series = to_series(history)
+        results[f'fast/{size}'] = measure(lambda: predictor.predict_prices(history, mode='fast'), repeat)
+        results[f'fast_columnar/{size}'] = measure(lambda: predictor.predict_prices(series, mode='fast'), repeat)
+        if size <= prophet_max:
+            results[f'prophet/{size}'] = measure(
+                lambda: predictor.predict_prices(history, mode='prophet'), max(1, repeat // 5)
+            )
+    return results
@@ -0,0 +1,91 @@
+"""Price parsing and scraping against product pages served locally.
+
+By default these are the fixtures in scraper/fixtures/: hand-written
+stand-ins with the real pages' selectors, not recordings. They run at
+their own ~1 KB size and padded to PAGE_SIZES, since real product pages
+are megabytes and parse time grows with size. Point `pages` at a
+directory of saved (scrubbed) `amazon_*.html` / `flipkart_*.html` pages
+to benchmark real markup instead.
+"""
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+import asyncio
+
+from benchmarks.timing import measure, measure_async
+from scraper.bench_profile import FIXTURES, SCRAPERS, pad_page, serve_fixtures
+from scraper.browser_pool import BrowserPool
+from scraper.http_fetcher import HttpFetcher
+
+# Sizes the stand-in pages are padded to, in bytes
+PAGE_SIZES = (1_500_000,)
+
+
+def _pages(root: Path) -> Iterator[Tuple[str, Path]]:
+    for page in sorted(root.glob('*.html')):
+        site = page.name.split('_')[0]
+        if site in SCRAPERS:
+            yield site, page
+
+
+def _variants(root: Path) -> Iterator[Tuple[str, str, Path, Optional[int]]]:
+    """(name, site, page, pad size) for every page and, for the stand-ins, each padded size."""
+    for site, page in _pages(root):
+        yield page.stem, site, page, None
+        if root == FIXTURES:
+            for size in PAGE_SIZES:
+                yield f'{page.stem}+{size // 1000}kb', site, page, size
+
+
+def bench_parse(repeat: int, root: Path = FIXTURES) -> Dict[str, Dict]:
+    """extract_price on each page."""
+    results = {}
+    for name, site, page, size in _variants(root):
+        html = page.read_text()
+        if size:
+            html = pad_page(html, size)
+        scraper = SCRAPERS[site]
+        results[name] = {
+            'bytes': len(html.encode()),
+            'price': scraper.extract_price(html),
+            **measure(lambda: scraper.extract_price(html), repeat),
+        }
+    return results
+
+
+async def bench_scrape(repeat: int, browser: bool = False, root: Path = FIXTURES) -> Dict[str, Dict]:
+    """get_price over HTTP (and optionally get_snapshot in Chromium) per page."""
+    server = serve_fixtures(root)
+    base = f'http://localhost:{server.server_port}'
+    fetcher = HttpFetcher()
+    pool = BrowserPool(max_pages=1) if browser else None
+    results = {}
+    try:
+        for name, site, page, size in _variants(root):
+            url = f'{base}/{page.name}' + (f'?pad={size}' if size else '')
+            scraper = SCRAPERS[site](pool=pool, fetcher=fetcher)
+            results[f'{name}/http'] = {
+                'price': await scraper.get_price(url),
+                **await measure_async(lambda: scraper.get_price(url), repeat),
+            }
+            if browser:
+                try:
+                    results[f'{name}/browser'] = {
+                        'price': (await scraper.get_snapshot(url))['price'],
+                        **await measure_async(lambda: scraper.get_snapshot(url), repeat),
+                    }
+                except Exception as e:
+                    results[f'{name}/browser'] = {'error': str(e)}
+    finally:
+        await fetcher.close()
+        if pool is not None:
+            await pool.stop()
+        server.shutdown()
+    return results
+
+
+def run(repeat: int, browser: bool = False, pages: Optional[str] = None) -> Dict[str, Dict]:
+    root = Path(pages) if pages else FIXTURES
+    return {
+        'parse': bench_parse(repeat * 10, root),
+        'scrape': asyncio.run(bench_scrape(repeat, browser, root)),
+    }
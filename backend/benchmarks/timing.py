@@ -0,0 +1,40 @@
+from typing import Awaitable, Callable, Dict, List
+import time
+
+import numpy as np
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Latency summary of repeated runs, in milliseconds."""
+    samples = np.array(samples_ms)
+    return {
+        'runs': len(samples),
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'min_ms': float(samples.min()),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Time `fn` over `repeat` runs after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+async def measure_async(fn: Callable[[], Awaitable], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Like measure, for coroutine functions."""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
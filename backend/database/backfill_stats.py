@@ -0,0 +1,83 @@
+"""Build running price statistics for products tracked before they existed.
+
+Products only gain `stats` from price writes, so a product tracked before
+them would report no insights, and after its next price only the prices
+seen since. This folds each such product's stored history into `stats`,
+counting one observation per refresh interval of every run (about what
+the scheduler would have recorded). Products that already have stats are
+left alone, so it is safe to run more than once. Run from the backend
+directory:
+
+    python -m database.backfill_stats
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import os
+
+import numpy as np
+
+from database.db import Database
+
+
+def history_stats(runs: List[Dict], until: Optional[datetime], interval: timedelta) -> Optional[Dict]:
+    """Weighted count/mean/M2, min, max, first and last price of stored runs.
+
+    Each run counts once per `interval` it lasted, and at least once; a run
+    lasts until the next one starts, the last one until `until`.
+    """
+    if not runs:
+        return None
+    prices = np.array([run['price'] for run in runs], dtype=float)
+    starts = [run['timestamp'] for run in runs]
+    last = max(filter(None, [runs[-1].get('last_seen'), until, starts[-1]]))
+    ends = starts[1:] + [last]
+    weights = np.array([max(1, (end - start) // interval) for start, end in zip(starts, ends)], dtype=float)
+
+    count = weights.sum()
+    mean = (weights * prices).sum() / count
+    return {
+        'count': int(count),
+        'mean': float(mean),
+        'm2': float((weights * (prices - mean) ** 2).sum()),
+        'min': float(prices.min()),
+        'max': float(prices.max()),
+        'first': float(prices[0]),
+        'last': float(prices[-1]),
+    }
+
+
+async def backfill(db: Database, interval: Optional[timedelta] = None) -> int:
+    """Set `stats` from history on every product without them; returns how many were set."""
+    interval = interval or timedelta(minutes=int(os.getenv('REFRESH_INTERVAL_MINUTES', '60')))
+    updated = 0
+    async for product in db.products.find({'stats': {'$exists': False}, 'key': {'$exists': True}},
+                                          {'key': 1, 'last_checked': 1}):
+        runs = await db.price_history.find(
+            {'key': product['key']}, {'_id': 0, 'price': 1, 'timestamp': 1, 'last_seen': 1}
+        ).sort('timestamp', 1).to_list(length=None)
+        stats = history_stats(runs, product.get('last_checked'), interval)
+        if stats is None:
+            continue
+        # A price written meanwhile started stats of its own; leave those be
+        result = await db.products.update_one(
+            {'_id': product['_id'], 'stats': {'$exists': False}}, {'$set': {'stats': stats}}
+        )
+        updated += result.modified_count
+    if updated:
+        print(f"✅ Built price statistics for {updated} products from their history")
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--interval-minutes', type=int, help='refresh interval (default: REFRESH_INTERVAL_MINUTES)')
+    args = parser.parse_args()
+
+    interval = timedelta(minutes=args.interval_minutes) if args.interval_minutes else None
+    asyncio.run(backfill(Database(), interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+import asyncio
+import os
+
+from database.db import Database
+
+
+class BulkPriceWriter:
+    """Buffers price results and writes them with Database.update_prices_bulk.
+
+    The buffer is flushed when it reaches `batch_size` results, every
+    `flush_interval` seconds while started, and on stop().
+    """
+
+    def __init__(self, db: Database, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        self.db = db
+        self.batch_size = batch_size or int(os.getenv('DB_BULK_BATCH_SIZE', '500'))
+        self.flush_interval = flush_interval or float(os.getenv('DB_BULK_FLUSH_SECONDS', '5'))
+
+        self._buffer: List[Dict] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {'written': 0, 'failed': 0, 'flushes': 0}
+
+    def start(self) -> None:
+        """Start flushing the buffer periodically."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def add(self, url: str, price: float) -> None:
+        self._buffer.append({'url': url, 'price': price})
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> Dict[str, str]:
+        """Write the buffered results and return per-URL errors."""
+        async with self._lock:
+            results, self._buffer = self._buffer, []
+            if not results:
+                return {}
+
+            errors = await self.db.update_prices_bulk(results, self.batch_size)
+            self._stats['flushes'] += 1
+            self._stats['failed'] += sum(1 for result in results if result['url'] in errors)
+            self._stats['written'] += sum(1 for result in results if result['url'] not in errors)
+            for url, error in errors.items():
+                print(f"Error writing price for {url}: {error}")
+            return errors
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'buffered': len(self._buffer)}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing price writes: {str(e)}")
@@ -1,117 +1,764 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime
-from typing import List, Dict, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Dict, Optional, Tuple
 import os
 from dotenv import load_dotenv
 
+from database.history import PriceSeries, runs_to_points, runs_to_series
+from monitoring.metrics import timed
+from scraper.canonical import canonicalize, product_key
+import numpy as np
+
 load_dotenv()
 
+_EPOCH = datetime(1970, 1, 1)
+
+# Indexes every collection needs: (keys, options) per collection. Products
+# are identified by `key`, the canonical product key of their URL (see
+# scraper.canonical), so URL variants share one document and one history.
+INDEXES = {
+    'products': [
+        ([('key', 1)], {'unique': True}),
+        # Due-product scans and worker lease claims, oldest check first
+        ([('is_active', 1), ('last_checked', 1)], {}),
+    ],
+    'price_history': [
+        # _id breaks ties between runs sharing a timestamp when paging
+        ([('key', 1), ('timestamp', 1), ('_id', 1)], {}),
+    ],
+    'alerts': [
+        # Outbox polling: pending alerts that are due for (re)delivery
+        ([('notified', 1), ('next_attempt_at', 1)], {}),
+    ],
+    'subscriptions': [
+        # Crossing lookups: one range scan over a URL's thresholds
+        ([('key', 1), ('threshold', 1)], {}),
+    ],
+}
+
+def naive_utc(value: datetime) -> datetime:
+    """`value` as the naive UTC datetime it is stored as; naive input is taken to be UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+# Position after the last run of a history page: its (timestamp, _id)
+PageCursor = Tuple[datetime, ObjectId]
+
+def encode_cursor(cursor: PageCursor) -> str:
+    timestamp, run_id = cursor
+    return f"{timestamp.isoformat()}~{run_id}"
+
+def decode_cursor(value: str) -> PageCursor:
+    """Parse a cursor from encode_cursor; raises ValueError if malformed.
+
+    A bare timestamp (the older cursor format) resumes after every run
+    starting at that time.
+    """
+    timestamp, _, run_id = value.partition('~')
+    try:
+        return naive_utc(datetime.fromisoformat(timestamp)), ObjectId(run_id or 'f' * 24)
+    except InvalidId as e:
+        raise ValueError(str(e))
+
+def crossing_filter(key: str, price: float, previous_price: Optional[float]) -> Optional[Dict]:
+    """Query for subscriptions whose threshold the move to `price` crossed.
+
+    A subscriber crossed when `price <= threshold` now but the previous
+    price was above it. Returns None when the price did not drop.
+    """
+    if previous_price is None:
+        return {'key': key, 'threshold': {'$gte': price}}
+    if price >= previous_price:
+        return None
+    return {'key': key, 'threshold': {'$gte': price, '$lt': previous_price}}
+
+def stats_update(price: float) -> List[Dict]:
+    """Pipeline stages folding one price into the product's running statistics.
+
+    Keeps count/mean/M2 (Welford's online variance), min, max, first and
+    last price in `stats`, so insights never need to read the history.
+    """
+    return [
+        {'$set': {
+            'stats.count': {'$add': [{'$ifNull': ['$stats.count', 0]}, 1]},
+            'stats.delta': {'$subtract': [price, {'$ifNull': ['$stats.mean', 0]}]},
+            'stats.min': {'$min': [{'$ifNull': ['$stats.min', price]}, price]},
+            'stats.max': {'$max': [{'$ifNull': ['$stats.max', price]}, price]},
+            'stats.first': {'$ifNull': ['$stats.first', price]},
+            'stats.last': price
+        }},
+        {'$set': {
+            'stats.mean': {'$add': [
+                {'$ifNull': ['$stats.mean', 0]},
+                {'$divide': ['$stats.delta', '$stats.count']}
+            ]}
+        }},
+        {'$set': {
+            'stats.m2': {'$add': [
+                {'$ifNull': ['$stats.m2', 0]},
+                {'$multiply': ['$stats.delta', {'$subtract': [price, '$stats.mean']}]}
+            ]}
+        }},
+        # Exclusion $project is $unset; spelled this way it also runs on mongomock
+        {'$project': {'stats.delta': 0}}
+    ]
+
 class Database:
-    def __init__(self):
-        # Correct way to access environment variables in Python
-        MONGO_URI = os.getenv('MONGO_URI')
-        
-        if not MONGO_URI:
-            raise ValueError("MONGODB_URI not found in environment variables")
-        
-        print(f"Connecting to MongoDB with URI: {MONGO_URI[:18]}...")  # Log first 20 chars for security
-        
-        self.client = AsyncIOMotorClient(MONGO_URI)
-        self.db = self.client["price_tracker"]
+    def __init__(self, client: Optional[AsyncIOMotorClient] = None, db_name: Optional[str] = None):
+        """Connect with MONGO_URI, or use `client` (e.g. an in-memory stand-in for benchmarks)."""
+        if client is None:
+            # Correct way to access environment variables in Python
+            MONGO_URI = os.getenv('MONGO_URI')
+            
+            if not MONGO_URI:
+                raise ValueError("MONGODB_URI not found in environment variables")
+            
+            print(f"Connecting to MongoDB with URI: {MONGO_URI[:18]}...")  # Log first 20 chars for security
+            
+            # Motor connects lazily; connect() verifies the connection
+            client = AsyncIOMotorClient(MONGO_URI)
+
+        self.client = client
+        self.db = self.client[db_name or os.getenv('MONGO_DB', 'price_tracker')]
         
-        # Verify connection
+        # Collections
+        self.products = self.db.products
+        self.price_history = self.db.price_history
+        self.alerts = self.db.alerts
+        self.subscriptions = self.db.subscriptions
+        self.timeseries = os.getenv('PRICE_HISTORY_TIMESERIES', '0') == '1'
+        self.bulk_batch_size = int(os.getenv('DB_BULK_BATCH_SIZE', '500'))
+
+        # Called with the URL after every recorded price
+        self._price_listeners: List[Callable[[str], None]] = []
+
+    async def connect(self) -> None:
+        """Ping the server so a bad URI or unreachable cluster fails at startup."""
         try:
-            # Ping the server to test connection
-            self.client.admin.command('ping')
+            await self.client.admin.command('ping')
             print("✅ Successfully connected to MongoDB")
         except Exception as e:
             print("❌ MongoDB connection failed:", str(e))
             raise
-        
-        # Collections
-        self.products = self.db.products
-        self.price_history = self.db.price_history
-        self.alerts = self.db.alerts
 
-    async def add_tracked_product(self, url: str, threshold: float) -> str:
+    def add_price_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback to run whenever a new price is recorded."""
+        self._price_listeners.append(listener)
+
+    async def ensure_indexes(self) -> None:
+        """Create the price_history collection (optionally time-series) and all indexes."""
+        if self.timeseries:
+            await self._ensure_timeseries_history()
+
+        for collection, indexes in INDEXES.items():
+            for keys, options in indexes:
+                try:
+                    await self.db[collection].create_index(keys, **options)
+                except Exception as e:
+                    # e.g. duplicate URLs blocking a unique index; check_indexes reports it
+                    print(f"❌ Could not create index on {collection} {keys}: {str(e)}")
+
+    async def check_indexes(self) -> List[str]:
+        """Return a description of every expected index that is missing."""
+        missing = []
+        for collection, indexes in INDEXES.items():
+            existing = await self.db[collection].index_information()
+            existing_keys = {tuple(tuple(key) for key in info['key']) for info in existing.values()}
+            for keys, options in indexes:
+                if tuple(keys) not in existing_keys:
+                    spec = ', '.join(f"{field}: {direction}" for field, direction in keys)
+                    missing.append(f"{collection} {{{spec}}}" + (' unique' if options.get('unique') else ''))
+        return missing
+
+    async def _ensure_timeseries_history(self) -> None:
+        # A regular collection cannot be converted in place, so an existing
+        # one is left alone and only reported
+        collections = await self.db.list_collections(filter={'name': 'price_history'}).to_list(length=1)
+        if not collections:
+            await self.db.create_collection(
+                'price_history',
+                timeseries={'timeField': 'timestamp', 'metaField': 'key', 'granularity': 'hours'}
+            )
+            print("Created time-series collection price_history")
+        elif collections[0].get('type') != 'timeseries':
+            print("⚠️ PRICE_HISTORY_TIMESERIES is set but price_history is a regular collection; "
+                  "migrate it manually to use the time-series layout")
+
+    @timed('db.add_tracked_product')
+    async def add_tracked_product(self, url: str, name: str, threshold: float,
+                                  current_price: float) -> str:
         """Add a new product to track."""
+        key, url = canonicalize(url)
         product = {
+            'key': key,
             'url': url,
             'name': name,
             'threshold': threshold,
-            'current_price': current_price,
-            'created_at': datetime.utcnow(),
             'last_checked': datetime.utcnow(),
             'is_active': True
         }
         
+        # An existing product keeps its price so update_price sees the change
+        # (and the threshold crossings it causes)
         result = await self.products.update_one(
-            {'url': url},
-            {'$set': product},
+            {'key': key},
+            {'$set': product, '$setOnInsert': {'created_at': datetime.utcnow(), 'current_price': current_price}},
             upsert=True
         )
         
         return str(result.upserted_id) if result.upserted_id else str(result.modified_count)
 
-    async def update_price(self, url: str, price: float) -> None:
-        """Add new price point to history."""
-        price_point = {
-            'url': url,
-            'price': price,
-            'timestamp': datetime.utcnow()
-        }
-        
-        await self.price_history.insert_one(price_point)
-        await self.products.update_one(
-            {'url': url},
-            {'$set': {'last_checked': datetime.utcnow()}}
+    @timed('db.update_price')
+    async def update_price(self, url: str, price: float) -> Optional[float]:
+        """Record a price check and return the previous price, if any.
+
+        History is stored as change points: a new document is only inserted
+        when the price differs from the current one; otherwise the current
+        run's `last_seen` is bumped.
+        """
+        key, url = canonicalize(url)
+        now = datetime.utcnow()
+        run_id = ObjectId()
+
+        # One round trip updates the product and tells us the previous price
+        # and open run; the run id only changes when the price does
+        previous = await self.products.find_one_and_update(
+            {'key': key},
+            [{'$set': {
+                'last_run_id': {'$cond': [
+                    {'$and': [
+                        {'$eq': ['$current_price', price]},
+                        {'$ne': [{'$ifNull': ['$last_run_id', None]}, None]}
+                    ]},
+                    '$last_run_id',
+                    run_id
+                ]},
+                'current_price': price,
+                'last_checked': now
+            }}] + stats_update(price),
+            projection={'current_price': 1, 'last_run_id': 1}
         )
 
-    async def get_price_history(self, url: str) -> List[Dict]:
-        """Get price history for a product."""
+        previous_price = previous.get('current_price') if previous else None
+        if previous and previous_price == price and previous.get('last_run_id'):
+            # Time-series collections cannot update measurements; there the
+            # readers close the open run at the product's last_checked
+            if not self.timeseries:
+                await self.price_history.update_one(
+                    {'_id': previous['last_run_id']},
+                    {'$set': {'last_seen': now}}
+                )
+        else:
+            await self.price_history.insert_one({
+                '_id': run_id,
+                'key': key,
+                'url': url,
+                'price': price,
+                'timestamp': now,
+                'last_seen': now
+            })
+
+        if previous is not None:
+            await self.record_crossings([(url, price, previous_price)])
+
+        for listener in self._price_listeners:
+            listener(url)
+
+        return previous_price
+
+    @timed('db.update_prices_bulk')
+    async def update_prices_bulk(self, results: List[Dict], batch_size: Optional[int] = None) -> Dict[str, str]:
+        """Record many price checks with unordered bulk writes.
+
+        `results` holds {'url', 'price'} dicts. Writes are grouped into
+        batches of `batch_size` (two bulk_write calls per batch, one per
+        collection) and the same change-point rules as update_price apply;
+        URLs of the same product update it in order. Returns an error
+        message per URL that failed; an empty dict means everything was
+        written.
+        """
+        batch_size = batch_size or self.bulk_batch_size
+        errors: Dict[str, str] = {}
+        for start in range(0, len(results), batch_size):
+            errors.update(await self._write_price_batch(results[start:start + batch_size]))
+        return errors
+
+    async def _write_price_batch(self, results: List[Dict]) -> Dict[str, str]:
+        identities = {result['url']: canonicalize(result['url']) for result in results}
+        keys = list({key for key, _ in identities.values()})
+        cursor = self.products.find({'key': {'$in': keys}}, {'key': 1, 'current_price': 1, 'last_run_id': 1})
+        state = {product['key']: product async for product in cursor}
+
+        history_ops, history_urls = [], []
+        product_ops, product_urls = [], []
+        changes = []
+        for result in results:
+            url, price = result['url'], result['price']
+            key, canonical = identities[url]
+            now = datetime.utcnow()
+            product = state.get(key)
+            if product is not None:
+                changes.append((url, price, product.get('current_price')))
+
+            if product and product.get('current_price') == price and product.get('last_run_id'):
+                run_id = product['last_run_id']
+                if not self.timeseries:
+                    history_ops.append(UpdateOne({'_id': run_id}, {'$set': {'last_seen': now}}))
+                    history_urls.append(url)
+            else:
+                run_id = ObjectId()
+                history_ops.append(InsertOne({
+                    '_id': run_id,
+                    'key': key,
+                    'url': canonical,
+                    'price': price,
+                    'timestamp': now,
+                    'last_seen': now
+                }))
+                history_urls.append(url)
+
+            if product is not None:
+                # Later results for the same URL in this batch build on this one
+                product.update({'current_price': price, 'last_run_id': run_id})
+                product_ops.append(UpdateOne(
+                    {'key': key},
+                    [{'$set': {'current_price': price, 'last_checked': now, 'last_run_id': run_id}}]
+                    + stats_update(price)
+                ))
+                product_urls.append(url)
+
+        errors: Dict[str, str] = {}
+        for collection, ops, op_urls in ((self.price_history, history_ops, history_urls),
+                                         (self.products, product_ops, product_urls)):
+            if not ops:
+                continue
+            try:
+                await collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get('writeErrors', []):
+                    errors[op_urls[error['index']]] = error.get('errmsg', 'write failed')
+            except Exception as e:
+                for url in op_urls:
+                    errors[url] = str(e)
+
+        try:
+            await self.record_crossings([change for change in changes if change[0] not in errors])
+        except Exception as e:
+            print(f"Error recording threshold crossings: {str(e)}")
+
+        for url in {canonical for result_url, (_, canonical) in identities.items() if result_url not in errors}:
+            for listener in self._price_listeners:
+                listener(url)
+
+        return errors
+
+    @timed('db.get_price_history')
+    async def get_price_history(self, url: str, resample: Optional[timedelta] = None) -> List[Dict]:
+        """Get price history for a product.
+
+        Returns change points by default; pass `resample` for regular samples.
+        """
         cursor = self.price_history.find(
-            {'url': url},
-            {'_id': 0, 'price': 1, 'timestamp': 1}
+            {'key': product_key(url)},
+            {'_id': 0, 'price': 1, 'timestamp': 1, 'last_seen': 1}
         ).sort('timestamp', 1)
         
-        history = await cursor.to_list(length=None)
-        return [{
-            'date': item['timestamp'],
-            'price': item['price']
-        } for item in history]
-
-    async def get_products_to_check(self) -> List[Dict]:
-        """Get all active products that need price check."""
-        cursor = self.products.find({'is_active': True})
+        runs = await cursor.to_list(length=None)
+        if self.timeseries:
+            key = product_key(url)
+            self._close_run(runs, (await self._last_checked([key])).get(key))
+        return runs_to_points(runs, resample)
+
+    @timed('db.get_price_series')
+    async def get_price_series(self, url: str, resample: Optional[timedelta] = None,
+                               batch_size: int = 10000) -> PriceSeries:
+        """Get price history as compact NumPy arrays instead of a list of dicts.
+
+        The server converts dates to epoch milliseconds and the arrays are
+        filled one cursor batch at a time, so no per-point datetime or
+        dict objects are kept around.
+        """
+        cursor = self.price_history.aggregate([
+            {'$match': {'key': product_key(url)}},
+            {'$sort': {'timestamp': 1}},
+            {'$project': {
+                '_id': 0,
+                't': {'$toLong': '$timestamp'},
+                'e': {'$toLong': {'$ifNull': ['$last_seen', '$timestamp']}},
+                'p': '$price'
+            }}
+        ], batchSize=batch_size)
+
+        starts, ends, prices = [], [], []
+        while True:
+            batch = await cursor.to_list(length=batch_size)
+            if not batch:
+                break
+            starts.append(np.fromiter((doc['t'] for doc in batch), np.int64, len(batch)))
+            ends.append(np.fromiter((doc['e'] for doc in batch), np.int64, len(batch)))
+            prices.append(np.fromiter((doc['p'] for doc in batch), np.float32, len(batch)))
+
+        if not starts:
+            return runs_to_series(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32))
+
+        ends = np.concatenate(ends)
+        if self.timeseries:
+            key = product_key(url)
+            last_checked = (await self._last_checked([key])).get(key)
+            if last_checked is not None:
+                ends[-1] = max(ends[-1], (last_checked - _EPOCH) // timedelta(milliseconds=1))
+        return runs_to_series(np.concatenate(starts), ends, np.concatenate(prices), resample)
+
+    @timed('db.get_price_history_page')
+    async def get_price_history_page(self, url: str, start: Optional[datetime] = None,
+                                     end: Optional[datetime] = None, after: Optional[PageCursor] = None,
+                                     limit: Optional[int] = None) -> Tuple[List[Dict], Optional[PageCursor]]:
+        """Get one page of change points within a time range.
+
+        Served by a range scan on the (key, timestamp, _id) index. `after` is
+        the cursor returned by the previous page, a (timestamp, _id) pair so
+        runs sharing a timestamp are not skipped at page boundaries. Returns
+        at most `limit` points and the cursor for the next page (None on the
+        last page).
+        """
+        key = product_key(url)
+        query = {'key': key}
+        time_range = {}
+        if start is not None:
+            time_range['$gte'] = start
+        if end is not None:
+            time_range['$lte'] = end
+        if time_range:
+            query['timestamp'] = time_range
+        if after is not None:
+            timestamp, after_id = after
+            query['$or'] = [{'timestamp': {'$gt': timestamp}}, {'timestamp': timestamp, '_id': {'$gt': after_id}}]
+
+        # The run in progress at `start` began earlier but still applies
+        opening = None
+        if start is not None and after is None:
+            opening = await self.price_history.find_one(
+                {'key': key, 'timestamp': {'$lt': start}},
+                {'price': 1, 'timestamp': 1, 'last_seen': 1},
+                sort=[('timestamp', -1), ('_id', -1)]
+            )
+            if opening is not None:
+                # Sorts before any run that starts exactly at `start`
+                opening = {**opening, 'timestamp': start, '_id': ObjectId('0' * 24)}
+
+        # The opening run takes one of the page's places
+        room = limit - 1 if limit and opening is not None else limit
+        if limit and not room:
+            runs = []
+            has_more = await self.price_history.find_one(query, {'_id': 1}) is not None
+        else:
+            cursor = self.price_history.find(
+                query,
+                {'price': 1, 'timestamp': 1, 'last_seen': 1}
+            ).sort([('timestamp', 1), ('_id', 1)])
+            if limit:
+                # One extra document tells us whether another page follows
+                cursor = cursor.limit(room + 1)
+            runs = await cursor.to_list(length=None)
+            has_more = bool(limit) and len(runs) > room
+            if has_more:
+                runs = runs[:room]
+        if opening is not None:
+            runs.insert(0, opening)
+
+        # Only the product's latest run is still open
+        if self.timeseries and runs and not has_more and (end is None or not await self.price_history.find_one(
+                {'key': key, 'timestamp': {'$gt': runs[-1]['timestamp']}}, {'_id': 1})):
+            self._close_run(runs, (await self._last_checked([key])).get(key))
+
+        points = runs_to_points(runs, close=not has_more, until=end)
+        next_cursor = (runs[-1]['timestamp'], runs[-1]['_id']) if has_more else None
+        return points, next_cursor
+
+    async def get_product_stats(self, url: str) -> Optional[Dict]:
+        """Get the running price statistics kept on a product, if any."""
+        product = await self.products.find_one({'key': product_key(url)}, {'_id': 0, 'stats': 1})
+        return product.get('stats') if product else None
+
+    @timed('db.get_products')
+    async def get_products(self, urls: List[str]) -> Dict[str, Dict]:
+        """Get stored products for several URLs, keyed by the URLs given."""
+        keys = {url: product_key(url) for url in urls}
+        cursor = self.products.find({'key': {'$in': list(set(keys.values()))}})
+        products = {product['key']: product async for product in cursor}
+        return {url: products[key] for url, key in keys.items() if key in products}
+
+    @timed('db.get_price_histories')
+    async def get_price_histories(self, urls: List[str],
+                                  resample: Optional[timedelta] = None) -> Dict[str, List[Dict]]:
+        """Get price histories for several products in one query, keyed by the URLs given."""
+        keys = {url: product_key(url) for url in urls}
+        cursor = self.price_history.find(
+            {'key': {'$in': list(set(keys.values()))}},
+            {'_id': 0, 'key': 1, 'price': 1, 'timestamp': 1, 'last_seen': 1}
+        ).sort([('key', 1), ('timestamp', 1)])
+
+        runs = {key: [] for key in keys.values()}
+        async for item in cursor:
+            runs[item['key']].append(item)
+        if self.timeseries:
+            last_checked = await self._last_checked(list(runs))
+            for key, product_runs in runs.items():
+                self._close_run(product_runs, last_checked.get(key))
+        return {url: runs_to_points(runs[key], resample) for url, key in keys.items()}
+
+    async def _last_checked(self, keys: List[str]) -> Dict[str, datetime]:
+        cursor = self.products.find({'key': {'$in': keys}}, {'_id': 0, 'key': 1, 'last_checked': 1})
+        return {product['key']: product['last_checked'] async for product in cursor if product.get('last_checked')}
+
+    @staticmethod
+    def _close_run(runs: List[Dict], last_checked: Optional[datetime]) -> None:
+        """Extend the latest run to the product's last check.
+
+        Time-series measurements cannot be updated, so their `last_seen` is
+        only the insert time; without this a flat price has a single point.
+        """
+        if runs and last_checked is not None:
+            last = runs[-1]
+            runs[-1] = {**last, 'last_seen': max(last.get('last_seen') or last['timestamp'], last_checked)}
+
+    @timed('db.get_products_to_check')
+    async def get_products_to_check(self, interval: Optional[timedelta] = None) -> List[Dict]:
+        """Get all active products that need price check.
+
+        With an `interval`, only products not checked within it are returned.
+        Products leased to a worker or held back after a failed scrape (see
+        defer_product) are left out until their lease expires.
+        """
+        now = datetime.utcnow()
+        query = {
+            'is_active': True,
+            '$or': [{'lease_expires': None}, {'lease_expires': {'$lt': now}}]
+        }
+        if interval is not None:
+            query['last_checked'] = {'$lt': now - interval}
+
+        cursor = self.products.find(query).sort('last_checked', 1)
         return await cursor.to_list(length=None)
 
-    async def add_alert(self, url: str, price: float, threshold: float) -> None:
-        """Record a price alert."""
-        alert = {
+    @timed('db.claim_product')
+    async def claim_product(self, owner: str, lease: timedelta,
+                            interval: Optional[timedelta] = None) -> Optional[Dict]:
+        """Lease the longest-unchecked due product to `owner`, or return None.
+
+        The claim is a single find_one_and_update, so concurrent workers never
+        get the same product. A product is claimable once its lease (if any)
+        has expired, which is how crashed workers' products are picked up.
+        """
+        now = datetime.utcnow()
+        query = {
+            'is_active': True,
+            # Leases are released by key; unkeyed products wait for migrate_keys
+            'key': {'$exists': True},
+            '$or': [{'lease_expires': None}, {'lease_expires': {'$lt': now}}]
+        }
+        if interval is not None:
+            query['last_checked'] = {'$lt': now - interval}
+
+        return await self.products.find_one_and_update(
+            query,
+            {'$set': {'lease_owner': owner, 'lease_expires': now + lease}},
+            sort=[('last_checked', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def renew_leases(self, owner: str, keys: List[str], lease: timedelta) -> int:
+        """Extend `owner`'s leases on `keys`; returns how many it still holds."""
+        if not keys:
+            return 0
+        result = await self.products.update_many(
+            {'key': {'$in': keys}, 'lease_owner': owner},
+            {'$set': {'lease_expires': datetime.utcnow() + lease}}
+        )
+        return result.matched_count
+
+    async def release_lease(self, key: str, owner: str, retry_after: Optional[timedelta] = None) -> None:
+        """Give up `owner`'s lease on a product.
+
+        With `retry_after` the product stays unclaimable for that long, so a
+        failing scrape is not retried immediately by another worker.
+        """
+        if retry_after is None:
+            update = {'$unset': {'lease_owner': '', 'lease_expires': ''}}
+        else:
+            update = {'$set': {'lease_expires': datetime.utcnow() + retry_after},
+                      '$unset': {'lease_owner': ''}}
+        await self.products.update_one({'key': key, 'lease_owner': owner}, update)
+
+    async def defer_product(self, url: str, retry_after: timedelta) -> None:
+        """Hold a product back from refreshes for `retry_after`, e.g. after a failed scrape.
+
+        Uses the worker lease expiry, so workers skip the product too.
+        """
+        await self.products.update_one(
+            {'key': product_key(url), 'lease_owner': None},
+            {'$set': {'lease_expires': datetime.utcnow() + retry_after}}
+        )
+
+    async def add_subscription(self, url: str, threshold: float, name: Optional[str] = None,
+                               email: Optional[str] = None, phone: Optional[str] = None) -> bool:
+        """Watch a product for a recipient; re-subscribing updates the threshold.
+
+        Returns True if the subscription is new.
+        """
+        key, url = canonicalize(url)
+        result = await self.subscriptions.update_one(
+            {'key': key, 'email': email, 'phone': phone},
+            {'$set': {'url': url, 'threshold': threshold, 'name': name},
+             '$setOnInsert': {'created_at': datetime.utcnow()}},
+            upsert=True
+        )
+        return result.upserted_id is not None
+
+    async def remove_subscription(self, url: str, email: Optional[str] = None,
+                                  phone: Optional[str] = None) -> None:
+        await self.subscriptions.delete_one({'key': product_key(url), 'email': email, 'phone': phone})
+
+    @timed('db.record_crossings')
+    async def record_crossings(self, changes: List[Tuple[str, float, Optional[float]]]) -> int:
+        """Queue alerts for every subscriber whose threshold a price change crossed.
+
+        `changes` holds (url, price, previous_price) tuples. All of them are
+        matched with one query (an indexed range scan per product) and the
+        alerts are inserted in one write. Returns the number of alerts.
+        """
+        filters = []
+        prices = {}
+        for url, price, previous_price in changes:
+            key = product_key(url)
+            query = crossing_filter(key, price, previous_price)
+            if query is not None:
+                filters.append(query)
+                # With repeated products the latest price is the one to report
+                prices[key] = price
+        if not filters:
+            return 0
+
+        cursor = self.subscriptions.find({'$or': filters})
+        alerts = [
+            self._alert_document(subscription['url'], prices[subscription['key']], subscription['threshold'],
+                                 subscription.get('name'), subscription.get('email'), subscription.get('phone'))
+            async for subscription in cursor
+        ]
+        if alerts:
+            await self.alerts.insert_many(alerts, ordered=False)
+        return len(alerts)
+
+    @staticmethod
+    def _alert_document(url: str, price: float, threshold: float, name: Optional[str],
+                        email: Optional[str], phone: Optional[str]) -> Dict:
+        now = datetime.utcnow()
+        return {
             'url': url,
+            'name': name,
             'price': price,
             'threshold': threshold,
-            'timestamp': datetime.utcnow(),
-            'notified': False
+            'email': email,
+            'phone': phone,
+            'timestamp': now,
+            'notified': False,
+            'attempts': 0,
+            'next_attempt_at': now
         }
+
+    @timed('db.add_alert')
+    async def add_alert(self, url: str, price: float, threshold: float, name: Optional[str] = None,
+                        email: Optional[str] = None, phone: Optional[str] = None) -> None:
+        """Record a price alert for the outbox to deliver."""
+        alert = self._alert_document(url, price, threshold, name, email, phone)
         
         await self.alerts.insert_one(alert)
 
-    async def get_pending_alerts(self) -> List[Dict]:
-        """Get all unnotified alerts."""
-        cursor = self.alerts.find({'notified': False})
+    @staticmethod
+    def _due_alerts(due: datetime) -> Dict:
+        # Alerts recorded before retries existed have no next_attempt_at and are due
+        return {'$or': [{'next_attempt_at': {'$lte': due}}, {'next_attempt_at': {'$exists': False}}]}
+
+    @timed('db.get_pending_alerts')
+    async def get_pending_alerts(self, limit: int = 0, due: Optional[datetime] = None) -> List[Dict]:
+        """Get unnotified alerts, oldest first.
+
+        With `due`, only alerts whose next delivery attempt is at or before
+        that time; alerts that were given up on are never returned.
+        """
+        query = {'notified': False, 'failed': {'$ne': True}}
+        if due is not None:
+            query.update(self._due_alerts(due))
+        cursor = self.alerts.find(query).sort('timestamp', 1).limit(limit)
         return await cursor.to_list(length=None)
 
+    @timed('db.claim_alerts')
+    async def claim_alerts(self, owner: str, limit: int, lease: timedelta) -> List[Dict]:
+        """Claim up to `limit` due alerts for delivery by `owner` and return them.
+
+        Each alert is claimed atomically with a per-batch claim id, so
+        outboxes in several processes never deliver the same alert. A claim
+        expires after `lease`, so alerts held by a process that died are
+        picked up again; mark_alerts_notified and retry_alerts release it.
+        """
+        now = datetime.utcnow()
+        query = {
+            'notified': False,
+            'failed': {'$ne': True},
+            '$and': [
+                self._due_alerts(now),
+                {'$or': [{'claim_expires': None}, {'claim_expires': {'$lt': now}}]}
+            ]
+        }
+        cursor = self.alerts.find(query, {'_id': 1}).sort('timestamp', 1).limit(limit)
+        ids = [alert['_id'] for alert in await cursor.to_list(length=None)]
+        if not ids:
+            return []
+
+        # The filter is re-checked per document, so alerts another process
+        # claimed in between are left alone
+        claim = ObjectId()
+        await self.alerts.update_many(
+            {**query, '_id': {'$in': ids}},
+            {'$set': {'claim': claim, 'claimed_by': owner, 'claim_expires': now + lease}}
+        )
+        return await self.alerts.find({'claim': claim}).sort('timestamp', 1).to_list(length=None)
+
     async def mark_alert_notified(self, alert_id: str) -> None:
         """Mark an alert as notified."""
-        await self.alerts.update_one(
-            {'_id': alert_id},
-            {'$set': {'notified': True}}
+        await self.mark_alerts_notified([alert_id])
+
+    async def mark_alerts_notified(self, alert_ids: List) -> int:
+        """Mark several alerts as notified in one update."""
+        if not alert_ids:
+            return 0
+        result = await self.alerts.update_many(
+            {'_id': {'$in': alert_ids}},
+            {'$set': {'notified': True, 'notified_at': datetime.utcnow()},
+             '$unset': {'claim': '', 'claimed_by': '', 'claim_expires': ''}}
         )
+        return result.modified_count
+
+    async def retry_alerts(self, alert_ids: List, next_attempt_at: Optional[datetime], error: str) -> None:
+        """Record a failed delivery; `next_attempt_at=None` gives up on the alerts."""
+        if not alert_ids:
+            return
+        update = {'$inc': {'attempts': 1}, '$set': {'last_error': error},
+                  '$unset': {'claim': '', 'claimed_by': '', 'claim_expires': ''}}
+        if next_attempt_at is None:
+            update['$set']['failed'] = True
+        else:
+            update['$set']['next_attempt_at'] = next_attempt_at
+        await self.alerts.update_many({'_id': {'$in': alert_ids}}, update)
 
     async def deactivate_product(self, url: str) -> None:
         """Stop tracking a product."""
         await self.products.update_one(
-            {'url': url},
+            {'key': product_key(url)},
             {'$set': {'is_active': False}}
         )
\ No newline at end of file
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class PriceSeries:
+    """Columnar price history: int64 epoch-millisecond timestamps and float32 prices.
+
+    A compact alternative to a list of {'date', 'price'} dicts that
+    PricePredictor accepts directly.
+    """
+
+    __slots__ = ('timestamps', 'prices')
+
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getstate__(self):
+        return (self.timestamps, self.prices)
+
+    def __setstate__(self, state):
+        self.timestamps, self.prices = state
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.timestamps.astype('datetime64[ms]')
+
+
+def runs_to_series(starts: np.ndarray, ends: np.ndarray, prices: np.ndarray,
+                   resample: Optional[timedelta] = None) -> PriceSeries:
+    """Vectorized runs_to_points for runs given as epoch-millisecond arrays."""
+    if len(starts) == 0:
+        return PriceSeries(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+
+    end = max(ends[-1], starts[-1])
+    if resample is None:
+        if end > starts[-1]:
+            return PriceSeries(np.append(starts, end), np.append(prices, prices[-1]))
+        return PriceSeries(starts, prices)
+
+    step = int(resample.total_seconds() * 1000)
+    samples = np.arange(starts[0], end + 1, step, dtype=np.int64)
+    # Index of the latest run that started at or before each sample
+    index = np.searchsorted(starts, samples, side='right') - 1
+    return PriceSeries(samples, prices[index])
+
+
+def runs_to_points(runs: List[Dict], resample: Optional[timedelta] = None,
+                   close: bool = True, until: Optional[datetime] = None) -> List[Dict]:
+    """Convert stored price runs to {'date', 'price'} points.
+
+    Each run is a price-history document with a `price`, the `timestamp` it
+    was first seen and the `last_seen` time it was last confirmed. Without
+    `resample` the change points are returned, plus a closing point at the
+    last confirmation so the flat tail is not lost. With `resample`, the
+    step function is sampled at a regular interval from the first change
+    point to the last confirmation, carrying prices forward across gaps.
+
+    `close=False` leaves out the closing point (e.g. for a page that is not
+    the last one) and `until` caps it.
+    """
+    if not runs:
+        return []
+
+    end = max(runs[-1].get('last_seen') or runs[-1]['timestamp'], runs[-1]['timestamp'])
+    if not close:
+        end = runs[-1]['timestamp']
+    if until is not None:
+        end = max(min(end, until), runs[-1]['timestamp'])
+
+    if resample is None:
+        points = [{'date': run['timestamp'], 'price': run['price']} for run in runs]
+        if end > runs[-1]['timestamp']:
+            points.append({'date': end, 'price': runs[-1]['price']})
+        return points
+
+    points = []
+    index = 0
+    sample: datetime = runs[0]['timestamp']
+    while sample <= end:
+        # Advance to the latest run that started at or before this sample
+        while index + 1 < len(runs) and runs[index + 1]['timestamp'] <= sample:
+            index += 1
+        points.append({'date': sample, 'price': runs[index]['price']})
+        sample += resample
+    return points
+
+
+def lttb(points: List[Dict], threshold: int) -> List[Dict]:
+    """Downsample points to `threshold` with largest-triangle-three-buckets.
+
+    Keeps the first and last point and, from each bucket in between, the
+    point forming the largest triangle with its neighbours, which preserves
+    the visual shape of the series (including spikes and drops).
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return points
+
+    first = points[0]['date']
+    x = np.array([(point['date'] - first).total_seconds() for point in points])
+    y = np.array([point['price'] for point in points], dtype=float)
+
+    bucket_size = (count - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third corner of the triangle
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected.append(previous)
+
+    selected.append(count - 1)
+    return [points[index] for index in selected]
@@ -0,0 +1,165 @@
+"""Migrate products, price history and subscriptions to canonical product keys.
+
+Documents written before product keys existed are identified by their raw
+URL, so referral, tracking and mobile variants of the same product were
+tracked separately. This sets `key` and the canonical `url` everywhere and
+merges duplicate products into the oldest one, then creates the key
+indexes. Safe to run more than once. Run from the backend directory:
+
+    python -m database.migrate_keys
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+
+from database.db import Database
+from scraper.canonical import canonicalize
+
+# Indexes on the raw URL that the key indexes replace
+LEGACY_INDEXES = {
+    'products': 'url_1',
+    'price_history': 'url_1_timestamp_1',
+    'subscriptions': 'url_1_threshold_1',
+}
+
+
+def merge_stats(first: Optional[Dict], second: Optional[Dict]) -> Optional[Dict]:
+    """Combine two products' running statistics, `first` being the older one.
+
+    Uses the parallel form of Welford's update (Chan et al.) for mean and M2.
+    """
+    if not first or not first.get('count'):
+        return second
+    if not second or not second.get('count'):
+        return first
+
+    count = first['count'] + second['count']
+    delta = second['mean'] - first['mean']
+    return {
+        'count': count,
+        'mean': first['mean'] + delta * second['count'] / count,
+        'm2': first['m2'] + second['m2'] + delta ** 2 * first['count'] * second['count'] / count,
+        'min': min(first['min'], second['min']),
+        'max': max(first['max'], second['max']),
+        'first': first['first'],
+        'last': second['last'],
+    }
+
+
+def _created(product: Dict) -> datetime:
+    return product.get('created_at') or product['_id'].generation_time.replace(tzinfo=None)
+
+
+async def _merge_products(db: Database, key: str, url: str, products: List[Dict]) -> None:
+    products.sort(key=_created)
+    keeper, duplicates = products[0], products[1:]
+    latest = max(products, key=lambda product: product.get('last_checked') or datetime.min)
+
+    stats = None
+    for product in products:
+        stats = merge_stats(stats, product.get('stats'))
+    if stats:
+        stats['last'] = (latest.get('stats') or stats)['last']
+
+    update = {
+        'key': key,
+        'url': url,
+        'is_active': any(product.get('is_active') for product in products),
+        'current_price': latest.get('current_price'),
+        'last_checked': latest.get('last_checked'),
+        'last_run_id': latest.get('last_run_id'),
+    }
+    if stats:
+        update['stats'] = stats
+
+    # Duplicates go first so the canonical URL is free for the keeper
+    if duplicates:
+        await db.products.delete_many({'_id': {'$in': [product['_id'] for product in duplicates]}})
+    await db.products.update_one({'_id': keeper['_id']}, {'$set': update})
+
+
+async def _rekey(collection, field_filter: Dict) -> int:
+    """Set key and canonical url on every document of `collection` matching the filter."""
+    updated = 0
+    for raw_url in await collection.distinct('url', field_filter):
+        key, url = canonicalize(raw_url)
+        result = await collection.update_many({**field_filter, 'url': raw_url}, {'$set': {'key': key, 'url': url}})
+        updated += result.modified_count
+    return updated
+
+
+async def _dedupe_subscriptions(db: Database) -> int:
+    """Drop subscriptions that became duplicates of one recipient's watch on a product."""
+    removed = 0
+    cursor = db.subscriptions.aggregate([
+        {'$group': {'_id': {'key': '$key', 'email': '$email', 'phone': '$phone'},
+                    'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ])
+    async for group in cursor:
+        result = await db.subscriptions.delete_many({'_id': {'$in': group['ids'][1:]}})
+        removed += result.deleted_count
+    return removed
+
+
+async def migrate(db: Database) -> Dict[str, int]:
+    summary = {'products': 0, 'merged': 0, 'history': 0, 'subscriptions': 0}
+
+    groups: Dict[str, List[Dict]] = defaultdict(list)
+    async for product in db.products.find({}):
+        groups[canonicalize(product['url'])[0]].append(product)
+
+    for key, products in groups.items():
+        url = canonicalize(products[0]['url'])[1]
+        if len(products) == 1 and products[0].get('key') == key and products[0]['url'] == url:
+            continue
+        await _merge_products(db, key, url, products)
+        summary['products'] += 1
+        summary['merged'] += len(products) - 1
+
+    if db.timeseries:
+        # Measurements in a time-series collection cannot gain a field
+        print("⚠️ price_history is a time-series collection; re-import it to add product keys")
+    else:
+        summary['history'] = await _rekey(db.price_history, {'key': {'$exists': False}})
+    summary['subscriptions'] = await _rekey(db.subscriptions, {'key': {'$exists': False}})
+    await _dedupe_subscriptions(db)
+
+    for collection, index in LEGACY_INDEXES.items():
+        try:
+            await db.db[collection].drop_index(index)
+        except Exception:
+            pass  # never created or already dropped
+    await db.ensure_indexes()
+    return summary
+
+
+def _report(summary: Dict[str, int]) -> None:
+    print(f"✅ Re-keyed {summary['products']} products (merged {summary['merged']} duplicates), "
+          f"{summary['history']} history runs and {summary['subscriptions']} subscriptions")
+
+
+async def migrate_if_needed(db: Database) -> Optional[Dict[str, int]]:
+    """Run migrate() if any product predates product keys; returns its summary or None.
+
+    Reads and writes match products on `key`, so an unkeyed product would
+    never be marked as checked and would be re-scraped on every sweep.
+    """
+    if await db.products.find_one({'key': {'$exists': False}}, {'_id': 1}) is None:
+        return None
+    summary = await migrate(db)
+    _report(summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    _report(asyncio.run(migrate(Database())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+import asyncio
+import statistics
+import pytest
+import mongomock_motor
+from database.backfill_stats import backfill, history_stats
+from database.db import Database
+from scraper.canonical import canonicalize
+
+KEY, URL = canonicalize('https://www.amazon.in/dp/B000000001')
+START = datetime(2024, 1, 1)
+HOUR = timedelta(hours=1)
+RUNS = [
+    {'price': 100.0, 'timestamp': START, 'last_seen': START + 2 * HOUR},
+    {'price': 90.0, 'timestamp': START + 3 * HOUR, 'last_seen': START + 3 * HOUR},
+    {'price': 95.0, 'timestamp': START + 4 * HOUR, 'last_seen': START + 5 * HOUR},
+]
+
+def test_history_stats_count_one_observation_per_interval():
+    stats = history_stats(RUNS, START + 6 * HOUR, HOUR)
+    # 100 for three hours, 90 for one, 95 until the last check
+    observed = [100.0] * 3 + [90.0] + [95.0] * 2
+    assert stats['count'] == len(observed)
+    assert stats['mean'] == pytest.approx(statistics.fmean(observed))
+    assert stats['m2'] / (stats['count'] - 1) == pytest.approx(statistics.variance(observed))
+    assert (stats['min'], stats['max'], stats['first'], stats['last']) == (90.0, 100.0, 100.0, 95.0)
+    assert history_stats([], None, HOUR) is None
+
+def test_backfill_sets_stats_that_later_prices_extend():
+    db = Database(client=mongomock_motor.AsyncMongoMockClient())
+
+    async def run():
+        await db.products.insert_one({'key': KEY, 'url': URL, 'name': 'Phone', 'threshold': 80,
+                                      'current_price': 95.0, 'last_checked': START + 6 * HOUR, 'is_active': True})
+        await db.price_history.insert_many([{'key': KEY, 'url': URL, **run} for run in RUNS])
+        updated = await backfill(db, HOUR)
+        again = await backfill(db, HOUR)
+        await db.update_price(URL, 80.0)
+        return updated, again, await db.get_product_stats(URL)
+
+    updated, again, stats = asyncio.run(run())
+    assert (updated, again) == (1, 0)
+    assert stats['count'] == 7
+    assert stats['mean'] == pytest.approx(statistics.fmean([100.0] * 3 + [90.0] + [95.0] * 2 + [80.0]))
+    assert stats['first'] == 100.0 and stats['last'] == 80.0 and stats['min'] == 80.0
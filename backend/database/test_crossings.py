@@ -0,0 +1,16 @@
+from database.db import crossing_filter
+
+def matches(query, threshold):
+    bounds = query['threshold']
+    return threshold >= bounds['$gte'] and threshold < bounds.get('$lt', float('inf'))
+
+def test_only_thresholds_crossed_since_previous_price():
+    query = crossing_filter('u', 80, 100)
+    assert [t for t in (50, 70, 80, 90, 100, 120) if matches(query, t)] == [80, 90]
+
+def test_price_rise_matches_nothing():
+    assert crossing_filter('u', 100, 80) is None
+    assert crossing_filter('u', 80, 80) is None
+
+def test_first_price_matches_every_threshold_above():
+    assert crossing_filter('u', 80, None) == {'key': 'u', 'threshold': {'$gte': 80}}
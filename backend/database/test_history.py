@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+import numpy as np
+from database.history import lttb, runs_to_points, runs_to_series
+
+RUNS = [
+    {'price': 100, 'timestamp': datetime(2023,1,1), 'last_seen': datetime(2023,1,2)},
+    {'price': 90, 'timestamp': datetime(2023,1,4), 'last_seen': datetime(2023,1,6)},
+]
+
+def test_change_points_with_closing_point():
+    points = runs_to_points(RUNS)
+    assert [p['price'] for p in points] == [100, 90, 90]
+    assert points[0]['date'] == datetime(2023,1,1)
+    assert points[-1]['date'] == datetime(2023,1,6)
+
+def test_resample_carries_price_forward():
+    points = runs_to_points(RUNS, timedelta(days=1))
+    assert [p['date'].day for p in points] == [1, 2, 3, 4, 5, 6]
+    assert [p['price'] for p in points] == [100, 100, 100, 90, 90, 90]
+
+def test_legacy_points_without_last_seen():
+    runs = [{'price': 5, 'timestamp': datetime(2023,1,1)}, {'price': 6, 'timestamp': datetime(2023,1,2)}]
+    assert runs_to_points(runs) == [
+        {'date': datetime(2023,1,1), 'price': 5},
+        {'date': datetime(2023,1,2), 'price': 6},
+    ]
+
+def _run_arrays(runs):
+    ms = lambda d: int((d - datetime(1970,1,1)).total_seconds() * 1000)
+    return (np.array([ms(r['timestamp']) for r in runs]), np.array([ms(r['last_seen']) for r in runs]),
+            np.array([r['price'] for r in runs], dtype=np.float32))
+
+def test_series_matches_points():
+    for resample in (None, timedelta(days=1)):
+        series = runs_to_series(*_run_arrays(RUNS), resample)
+        points = runs_to_points(RUNS, resample)
+        assert list(series.dates.astype(datetime)) == [p['date'] for p in points]
+        assert series.prices.tolist() == [p['price'] for p in points]
+        assert series.timestamps.dtype == np.int64 and series.prices.dtype == np.float32
+
+def test_empty_history():
+    assert runs_to_points([]) == []
+    assert runs_to_points([], timedelta(days=1)) == []
+
+def test_closing_point_capped_and_optional():
+    assert runs_to_points(RUNS, until=datetime(2023,1,5))[-1]['date'] == datetime(2023,1,5)
+    assert runs_to_points(RUNS, close=False)[-1]['date'] == datetime(2023,1,4)
+
+def test_lttb_keeps_endpoints_and_spike():
+    points = [{'date': datetime(2023,1,1) + timedelta(hours=i), 'price': 100} for i in range(500)]
+    points[250]['price'] = 10
+    sampled = lttb(points, 20)
+    assert len(sampled) == 20
+    assert sampled[0] is points[0]
+    assert sampled[-1] is points[-1]
+    assert any(point['price'] == 10 for point in sampled)
+
+def test_lttb_short_series_unchanged():
+    points = [{'date': datetime(2023,1,i), 'price': i} for i in range(1, 6)]
+    assert lttb(points, 10) == points
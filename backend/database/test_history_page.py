@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import mongomock_motor
+from database.db import Database, decode_cursor, encode_cursor, product_key
+
+URL = 'https://www.amazon.in/dp/B000000001'
+START = datetime(2024, 1, 1)
+
+async def make_db():
+    db = Database(client=mongomock_motor.AsyncMongoMockClient())
+    # Bulk imports can record several runs at the same instant
+    times = [START, START + timedelta(hours=1), START + timedelta(hours=1),
+             START + timedelta(hours=1), START + timedelta(hours=2)]
+    await db.price_history.insert_many([
+        {'key': product_key(URL), 'url': URL, 'price': 100 + index, 'timestamp': when, 'last_seen': when}
+        for index, when in enumerate(times)
+    ])
+    return db
+
+async def read_pages(db, limit, start=None):
+    pages, after = [], None
+    while True:
+        points, after = await db.get_price_history_page(URL, start, after=after, limit=limit)
+        pages.append(points)
+        if after is None:
+            return pages
+        after = decode_cursor(encode_cursor(after))
+
+def test_pages_keep_runs_that_share_a_timestamp():
+    async def run():
+        return await read_pages(await make_db(), limit=2)
+
+    pages = asyncio.run(run())
+    assert [[point['price'] for point in page] for page in pages] == [[100, 101], [102, 103], [104]]
+
+def test_opening_run_counts_towards_limit():
+    async def run():
+        db = await make_db()
+        return (await read_pages(db, limit=2, start=START + timedelta(minutes=30)),
+                await read_pages(db, limit=1, start=START + timedelta(minutes=30)))
+
+    pages, single = asyncio.run(run())
+    assert all(len(page) <= 2 for page in pages)
+    assert [[point['price'] for point in page] for page in pages] == [[100, 101], [102, 103], [104]]
+    assert pages[0][0]['date'] == START + timedelta(minutes=30)
+    assert [point['price'] for page in single for point in page] == [100, 101, 102, 103, 104]
+
+def test_legacy_cursor_resumes_after_its_timestamp():
+    timestamp, _ = decode_cursor((START + timedelta(hours=1)).isoformat())
+    assert timestamp == START + timedelta(hours=1)
+    with pytest.raises(ValueError):
+        decode_cursor(f'{START.isoformat()}~nope')
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+import asyncio
+import statistics
+import pytest
+import mongomock_motor
+from database.db import Database
+from database.migrate_keys import merge_stats, migrate_if_needed
+
+def stats_of(prices):
+    mean = statistics.fmean(prices)
+    return {'count': len(prices), 'mean': mean, 'm2': sum((p - mean) ** 2 for p in prices),
+            'min': min(prices), 'max': max(prices), 'first': prices[0], 'last': prices[-1]}
+
+def test_merge_stats_matches_combined_series():
+    older, newer = [100, 90, 95], [80, 85]
+    merged = merge_stats(stats_of(older), stats_of(newer))
+    expected = stats_of(older + newer)
+    for field in expected:
+        assert merged[field] == pytest.approx(expected[field])
+
+def test_merge_stats_with_missing_side():
+    stats = stats_of([5, 6])
+    assert merge_stats(None, stats) is stats
+    assert merge_stats(stats, {}) is stats
+
+def test_startup_migration_rekeys_legacy_products():
+    url = 'https://www.amazon.in/dp/B000000001?tag=ref'
+    checked = datetime.utcnow() - timedelta(days=1)
+
+    async def run():
+        db = Database(client=mongomock_motor.AsyncMongoMockClient())
+        # Shaped as products were before product keys
+        await db.products.insert_one({'url': url, 'name': 'Phone', 'threshold': 80, 'current_price': 100.0,
+                                      'last_checked': checked, 'is_active': True})
+        await db.price_history.insert_one({'url': url, 'price': 100.0, 'timestamp': checked, 'last_seen': checked})
+        unclaimed = await db.claim_product('w', timedelta(minutes=5))
+        summary = await migrate_if_needed(db)
+        again = await migrate_if_needed(db)
+
+        await db.update_price(url, 95.0)
+        due = await db.get_products_to_check(timedelta(hours=1))
+        await db.add_tracked_product(url, 'Phone', 80, 95.0)
+        return (unclaimed, summary, again, due, await db.products.count_documents({}),
+                await db.get_price_history(url))
+
+    unclaimed, summary, again, due, products, history = asyncio.run(run())
+    assert unclaimed is None
+    assert summary['products'] == 1 and summary['history'] == 1
+    assert again is None
+    assert due == []
+    assert products == 1
+    assert [point['price'] for point in history][:2] == [100.0, 95.0]
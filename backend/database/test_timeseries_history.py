@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime, timedelta
+import mongomock_motor
+from database.db import Database
+
+URL = 'https://www.amazon.in/dp/B000000001'
+
+def test_flat_price_history_closes_at_last_check():
+    db = Database(client=mongomock_motor.AsyncMongoMockClient())
+    # Measurements are never updated, as in a time-series collection
+    db.timeseries = True
+
+    async def run():
+        await db.add_tracked_product(URL, 'Phone', 80, 100)
+        await db.update_price(URL, 100)
+        await db.update_price(URL, 100)
+        first = (await db.price_history.find_one({}))['timestamp']
+        # Later checks at the same price only move last_checked
+        await db.products.update_one({}, {'$set': {'last_checked': first + timedelta(days=3)}})
+        return (first,
+                await db.get_price_history(URL),
+                await db.get_price_history(URL, timedelta(days=1)),
+                await db.get_price_histories([URL], timedelta(days=1)),
+                await db.get_price_history_page(URL, end=first + timedelta(days=1)),
+                await db.price_history.count_documents({}))
+
+    first, points, daily, histories, (page, _), runs = asyncio.run(run())
+    assert runs == 1
+    assert points == [{'date': first, 'price': 100}, {'date': first + timedelta(days=3), 'price': 100}]
+    assert len(daily) == 4
+    assert histories[URL] == daily
+    assert page[-1] == {'date': first + timedelta(days=1), 'price': 100}
@@ -1,17 +1,76 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Process start, for reporting cold-start time (imports included)
+STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import json
+import os
 import uvicorn
 
-from scraper.amazon_scraper import AmazonScraper
-from scraper.flipkart_scraper import FlipkartScraper
-from predictor.predict import PricePredictor
-from database.db import Database
+from scraper.browser_pool import shared_pool
+from scraper.http_fetcher import shared_fetcher
+from scraper.price_cache import shared_cache
+from scraper.registry import resolve
+from scraper.canonical import canonical_url
+from scheduler.refresh import RefreshScheduler
+from predictor.predict import PricePredictor, MODES
+from predictor.executor import ForecastQueueFull
+from database.db import Database, decode_cursor, encode_cursor, naive_utc
+from database.history import lttb
+from database.backfill_stats import backfill as backfill_stats
+from database.migrate_keys import migrate_if_needed
 from alerts.notifier import Notifier
+from alerts.outbox import AlertOutbox
+from monitoring.metrics import REQUEST_SECONDS, registry, server_timing, stage, start_profile
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    imported = time.perf_counter()
+    with stage('startup.db'):
+        await db.connect()
+        # Before the indexes: a unique key index can't be built over unkeyed products
+        await migrate_if_needed(db)
+        await db.ensure_indexes()
+        missing = await db.check_indexes()
+        # Products tracked before running statistics existed
+        await backfill_stats(db, scheduler.interval)
+    if missing:
+        print("⚠️ Missing MongoDB indexes:", "; ".join(missing))
+
+    # Scrapers share one long-lived browser pool for the life of the app
+    with stage('startup.browser_pool'):
+        await shared_pool.start()
+    if os.getenv('STARTUP_PREWARM', '0') == '1':
+        # Pay for Prophet's import, the forecasting processes and Chromium
+        # now rather than on the first request that needs them
+        with stage('startup.prewarm'):
+            await asyncio.gather(predictor.prewarm(), shared_pool.prewarm())
+    if os.getenv('REFRESH_ENABLED', '1') == '1':
+        scheduler.start()
+    outbox.start()
+
+    ready = time.perf_counter()
+    startup['import_seconds'] = imported - STARTED
+    startup['ready_seconds'] = ready - STARTED
+    print(f"✅ Started in {ready - STARTED:.2f}s (imports {imported - STARTED:.2f}s)")
+    yield
+    await scheduler.stop()
+    await outbox.stop()
+    await shared_fetcher.close()
+    await shared_pool.stop()
+    predictor.executor.shutdown()
+    notifier.close()
 
-app = FastAPI(title="Smart Price Tracker API")
+app = FastAPI(title="Smart Price Tracker API", lifespan=lifespan)
 
 # Enable CORS for Chrome Extension
 app.add_middleware(
@@ -20,12 +79,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
 # Initialize components
+startup: Dict[str, float] = {}
 db = Database()
-predictor = PricePredictor()
+predictor = PricePredictor(mode=os.getenv('FORECAST_MODE', 'auto'))
 notifier = Notifier()
+outbox = AlertOutbox(db, notifier)
+db.add_price_listener(predictor.invalidate)
+scheduler = RefreshScheduler(db, predictor)
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """Record request latency; `X-Profile: 1` returns per-stage timings as Server-Timing."""
+    profile = start_profile() if request.headers.get('x-profile') == '1' else None
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    # Label by route template so /api/history?url=... is one series
+    route = getattr(request.scope.get('route'), 'path', 'unmatched')
+    REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=str(response.status_code))
+    if profile is not None:
+        profile.append(('total', elapsed))
+        response.headers['Server-Timing'] = server_timing(profile)
+    return response
 
 class PriceHistory(BaseModel):
     date: datetime
@@ -37,12 +117,18 @@ class PricePrediction(BaseModel):
     recommendation: str
     confidence: float
 
+class BatchPriceRequest(BaseModel):
+    urls: List[str]
+    max_age_minutes: Optional[int] = None
+
 class TrackRequest(BaseModel):
     url: str
     name: str
     price: float
     threshold: float
     last_checked: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
 
 class TrackingResponse(BaseModel):
     status: str
@@ -55,20 +141,91 @@ def root():
     return {"message": "FastAPI is working!"}
 
 @app.get("/api/price")
-async def get_current_price(url: str):
+async def get_current_price(url: str, max_age: Optional[float] = None):
     try:
-        if 'amazon' in url:
-            scraper = AmazonScraper()
-        elif 'flipkart' in url:
-            scraper = FlipkartScraper()
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported website")
-            
-        price = await scraper.get_price(url)
+        scraper, url = resolve(url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Concurrent requests for the same product (any URL variant) share a single scrape
+        price = await shared_cache.get_or_fetch(url, lambda: scraper.get_price(url), max_age)
         return {"price": price}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/prices")
+async def get_current_prices(request: BatchPriceRequest):
+    """Price many URLs at once, streaming one NDJSON line per URL as it completes.
+
+    Prices checked within `max_age_minutes` are served from the database;
+    only stale or unknown URLs are scraped, once per product however many
+    URL variants point at it. Lines carry the URL as requested.
+    """
+    urls = list(dict.fromkeys(request.urls))
+    products = await db.get_products(urls)
+    max_age = request.max_age_minutes
+    if max_age is None:
+        max_age = int(os.getenv('BATCH_PRICE_MAX_AGE_MINUTES', '60'))
+    cutoff = datetime.utcnow() - timedelta(minutes=max_age)
+    semaphore = asyncio.Semaphore(int(os.getenv('BATCH_PRICE_CONCURRENCY', '4')))
+
+    async def scrape(requested: List[str]) -> List[Dict]:
+        try:
+            scraper, url = resolve(requested[0])
+            async with semaphore:
+                price = await shared_cache.get_or_fetch(url, lambda: scraper.get_price(url))
+            # Only tracked products get a history entry
+            if any(variant in products for variant in requested):
+                await db.update_price(url, price)
+            return [{"url": variant, "price": price, "source": "scraped"} for variant in requested]
+        except Exception as e:
+            return [{"url": variant, "error": str(e)} for variant in requested]
+
+    async def stream():
+        stale: Dict[str, List[str]] = {}
+        for url in urls:
+            product = products.get(url)
+            if product and product.get('current_price') is not None and product['last_checked'] >= cutoff:
+                yield json.dumps({
+                    "url": url,
+                    "price": product['current_price'],
+                    "source": "stored",
+                    "checked_at": product['last_checked'].isoformat()
+                }) + "\n"
+            else:
+                stale.setdefault(canonical_url(url), []).append(url)
+
+        for results in asyncio.as_completed([scrape(requested) for requested in stale.values()]):
+            for result in await results:
+                yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/startup")
+def get_startup():
+    return startup
+
+@app.get("/api/scraper/stats")
+async def get_scraper_stats():
+    return {
+        "tiers": shared_fetcher.stats(),
+        "browser_pool": shared_pool.stats(),
+        "cache": shared_cache.stats(),
+        "scheduler": scheduler.stats()
+    }
+
+@app.get("/api/alerts/stats")
+async def get_alert_stats():
+    return {
+        "outbox": outbox.stats(),
+        "notifier": notifier.stats()
+    }
+
 @app.post("/api/track", response_model=TrackingResponse)
 async def track_product(request: TrackRequest):
     try:
@@ -80,21 +237,39 @@ async def track_product(request: TrackRequest):
             current_price=request.price
         )
         
-        # Add initial price to history
-        await db.update_price(request.url, request.price)
+        # Subscribe first so the requester is matched like any other watcher
+        created = await db.add_subscription(
+            request.url,
+            request.threshold,
+            name=request.name,
+            email=request.email,
+            phone=request.phone
+        )
+        
+        # Add the price to history; alerts every subscriber whose threshold it crossed
+        previous_price = await db.update_price(request.url, request.price)
         
         # Get history and generate prediction
-        history = await db.get_price_history(request.url)
-        prediction = predictor.predict_prices(history)
+        history = await db.get_price_series(request.url, predictor.SAMPLE_INTERVAL)
+        try:
+            prediction = await predictor.predict_async(history, url=canonical_url(request.url))
+        except ValueError:
+            # Not enough history yet for a newly tracked product
+            prediction = None
         
-        # Check for price alerts
-        if request.price <= request.threshold:
-            await notifier.send_alert(
-                product_id=product_id,
-                product_name=request.name,
-                current_price=request.price,
-                threshold=request.threshold
+        # A new subscription whose threshold the price is already under was
+        # not crossed, so it gets its alert here; the outbox delivers in the background
+        crossed = previous_price is None or previous_price > request.threshold
+        if created and request.price <= request.threshold and not crossed:
+            await db.add_alert(
+                request.url,
+                request.price,
+                request.threshold,
+                name=request.name,
+                email=request.email,
+                phone=request.phone
             )
+        outbox.wake()
         
         return {
             "status": "success",
@@ -107,19 +282,66 @@ async def track_product(request: TrackRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/history")
-async def get_price_history(url: str) -> List[PriceHistory]:
+async def get_price_history(
+    response: Response,
+    url: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=3)
+) -> List[PriceHistory]:
+    """Price history within `from`/`to`, paged with `limit`/`cursor`.
+
+    The next page's cursor is returned in the X-Next-Cursor header. With
+    `points`, the result is downsampled to at most that many points.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # History is stored in naive UTC; clients may send `from`/`to` with an offset
+    start = naive_utc(start) if start is not None else None
+    end = naive_utc(end) if end is not None else None
+
+    try:
+        history, next_cursor = await db.get_price_history_page(url, start, end, after, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_cursor)
+    if points is not None:
+        history = lttb(history, points)
+    return history
+
+@app.get("/api/insights")
+async def get_price_insights(url: str):
     try:
-        history = await db.get_price_history(url)
-        return history
+        stats = await db.get_product_stats(url)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if not stats:
+        raise HTTPException(status_code=404, detail="No price statistics for this product yet")
+    return predictor.insights_from_stats(stats)
+
 @app.get("/api/predict")
-async def predict_price(url: str) -> PricePrediction:
+async def predict_price(url: str, mode: Optional[str] = None, sla_ms: Optional[float] = None) -> PricePrediction:
+    if mode is not None and mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MODES)}")
+
     try:
-        history = await db.get_price_history(url)
-        prediction = predictor.predict_prices(history)
+        history = await db.get_price_series(url, predictor.SAMPLE_INTERVAL)
+        prediction = await predictor.predict_async(history, url=canonical_url(url), mode=mode, sla_ms=sla_ms)
         return prediction
+    except ForecastQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except BrokenProcessPool:
+        # The forecasting process died; its replacement serves the next request
+        raise HTTPException(status_code=503, detail="Forecast worker crashed, please retry")
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,181 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.labelnames, key)} {value}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (seconds by convention)."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., +Inf count], sum
+        self._values: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            else:
+                entry[0][-1] += 1
+            entry[1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = {key: ([*counts], total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{float(bound)}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, key)} {total}'
+            yield f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    'price_tracker_stage_seconds', 'Time spent in each instrumented stage.', ['stage']
+))
+STAGE_ERRORS = registry.register(Counter(
+    'price_tracker_stage_errors_total', 'Stages that raised an exception.', ['stage']
+))
+REQUEST_SECONDS = registry.register(Histogram(
+    'price_tracker_http_request_seconds', 'HTTP request latency.', ['method', 'route', 'status']
+))
+SCRAPES = registry.register(Counter(
+    'price_tracker_scrapes_total', 'Scrapes by site and the tier that served them.', ['site', 'tier']
+))
+BROWSER_REQUESTS = registry.register(Counter(
+    'price_tracker_browser_requests_total',
+    'Scraping browser requests by site and page-profile outcome (allowed or why blocked).', ['site', 'outcome']
+))
+BROWSER_BYTES = registry.register(Counter(
+    'price_tracker_browser_bytes_total', 'Response bytes scraping browsers loaded (by Content-Length).', ['site']
+))
+
+# Stage timings of the current request when it asked to be profiled
+_profile: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('profile', default=None)
+
+
+def start_profile() -> List[Tuple[str, float]]:
+    """Collect (stage, seconds) for every stage run in this context from now on."""
+    profile: List[Tuple[str, float]] = []
+    _profile.set(profile)
+    return profile
+
+
+def server_timing(profile: List[Tuple[str, float]]) -> str:
+    """Format a profile as a Server-Timing header value."""
+    return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in profile)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a stage timed elsewhere, e.g. in a worker process, as if run here."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    profile = _profile.get()
+    if profile is not None:
+        profile.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as `name` (works around awaits too)."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def timed(name: str):
+    """Decorator form of stage() for sync and async functions."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
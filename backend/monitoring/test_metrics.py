@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from monitoring.metrics import Counter, Histogram, Registry, server_timing, stage, start_profile, timed
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram('demo_seconds', 'Demo.', ['stage'], buckets=(0.1, 1)))
+    histogram.observe(0.05, stage='a')
+    histogram.observe(0.5, stage='a')
+    histogram.observe(5, stage='a')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP demo_seconds Demo.', '# TYPE demo_seconds histogram']
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{stage="a"} 5.55' in lines
+    assert 'demo_seconds_count{stage="a"} 3' in lines
+
+def test_counter_escapes_label_values():
+    counter = Counter('demo_total', 'Demo.', ['route'])
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+    assert list(counter.samples()) == ['demo_total{route="/a\\"b"} 3']
+
+def test_stage_records_profile_and_errors():
+    profile = start_profile()
+    with stage('test.ok'):
+        pass
+    with pytest.raises(ValueError):
+        with stage('test.fail'):
+            raise ValueError()
+
+    assert [name for name, _ in profile] == ['test.ok', 'test.fail']
+    assert server_timing([('a.b', 0.0123)]) == 'a.b;dur=12.3'
+
+def test_timed_wraps_coroutines():
+    @timed('test.async')
+    async def work():
+        await asyncio.sleep(0)
+        return 42
+
+    async def run():
+        profile = start_profile()
+        return await work(), profile
+
+    result, profile = asyncio.run(run())
+    assert result == 42
+    assert [name for name, _ in profile] == ['test.async']
@@ -0,0 +1,90 @@
+"""Backtest the fast forecaster against Prophet on step-shaped price series.
+
+Rolling-origin evaluation: each series is cut at several points, both
+engines forecast the following days from the prefix, and the forecasts are
+scored against what actually happened. Run from the backend directory:
+
+    python -m predictor.backtest --series 20 --days 90
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+import argparse
+import json
+import time
+
+import numpy as np
+
+from predictor.predict import PricePredictor
+
+
+def generate_step_series(days: int, rng: np.random.Generator, base_price: float = 1000) -> List[Dict]:
+    """Daily prices that stay flat for days, with occasional sales and hikes."""
+    prices = np.empty(days)
+    price = base_price
+    for day in range(days):
+        if rng.random() < 0.08:
+            price = max(price * (1 + rng.normal(0, 0.08)), base_price * 0.3)
+        prices[day] = round(price, 2)
+
+    start = datetime(2023, 1, 1)
+    return [{'date': start + timedelta(days=day), 'price': float(p)} for day, p in enumerate(prices)]
+
+
+def backtest(series: List[List[Dict]], days_ahead: int = 7, origins: int = 3) -> Dict[str, Dict]:
+    """Score every mode on the same cut points and return MAE/MAPE/latency per mode."""
+    predictor = PricePredictor()
+    results = {}
+
+    for mode in ('fast', 'prophet'):
+        errors, pct_errors, latencies = [], [], []
+        for history in series:
+            length = len(history)
+            for origin in np.linspace(length // 2, length - days_ahead, origins, dtype=int):
+                train = history[:origin]
+                actual = np.array([point['price'] for point in history[origin:origin + days_ahead]])
+
+                started = time.perf_counter()
+                prediction = predictor.predict_prices(train, days_ahead, mode=mode)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+                predicted = np.array(prediction['prices'][:len(actual)])
+                errors.append(np.mean(np.abs(predicted - actual)))
+                pct_errors.append(np.mean(np.abs(predicted - actual) / actual) * 100)
+
+        results[mode] = {
+            'forecasts': len(latencies),
+            'mae': float(np.mean(errors)),
+            'mape': float(np.mean(pct_errors)),
+            'latency_ms_p50': float(np.percentile(latencies, 50)),
+            'latency_ms_p95': float(np.percentile(latencies, 95)),
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', type=int, default=10, help='number of synthetic products')
+    parser.add_argument('--days', type=int, default=90, help='days of history per product')
+    parser.add_argument('--days-ahead', type=int, default=7)
+    parser.add_argument('--origins', type=int, default=3, help='cut points per series')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    series = [generate_step_series(args.days, rng) for _ in range(args.series)]
+    results = backtest(series, args.days_ahead, args.origins)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':<8} {'n':>5} {'MAE':>10} {'MAPE %':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['forecasts']:>5} {r['mae']:>10.2f} {r['mape']:>8.2f} "
+              f"{r['latency_ms_p50']:>9.2f} {r['latency_ms_p95']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
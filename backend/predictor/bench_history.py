@@ -0,0 +1,118 @@
+"""Compare list-of-dicts and columnar history handoff to the predictor.
+
+Builds the same history both ways from simulated cursor batches (what
+Database.get_price_history and Database.get_price_series see from MongoDB)
+and measures peak memory and time to build it and run the predictor steps
+that consume it. Run from the backend directory:
+
+    python -m predictor.bench_history --points 100000
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from database.history import runs_to_points, runs_to_series
+from predictor.predict import PricePredictor
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def generate_runs(points: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Hourly price runs (one document per point), as epoch milliseconds."""
+    starts = (datetime(2020, 1, 1) - EPOCH) // timedelta(milliseconds=1) + np.arange(points, dtype=np.int64) * 3_600_000
+    prices = np.round(1000 + np.cumsum(rng.normal(0, 5, points)), 2)
+    return {'t': starts, 'e': starts + 1_800_000, 'p': prices}
+
+
+def dict_batches(runs: Dict[str, np.ndarray], batch_size: int) -> Iterator[List[Dict]]:
+    """Documents as a find() over price_history returns them."""
+    for offset in range(0, len(runs['t']), batch_size):
+        yield [
+            {'price': float(p), 'timestamp': EPOCH + timedelta(milliseconds=int(t)),
+             'last_seen': EPOCH + timedelta(milliseconds=int(e))}
+            for t, e, p in zip(*(runs[k][offset:offset + batch_size] for k in ('t', 'e', 'p')))
+        ]
+
+
+def columnar_batches(runs: Dict[str, np.ndarray], batch_size: int) -> Iterator[List[Dict]]:
+    """Documents as the get_price_series aggregation returns them."""
+    for offset in range(0, len(runs['t']), batch_size):
+        yield [
+            {'t': int(t), 'e': int(e), 'p': float(p)}
+            for t, e, p in zip(*(runs[k][offset:offset + batch_size] for k in ('t', 'e', 'p')))
+        ]
+
+
+def load_dicts(runs: Dict[str, np.ndarray], batch_size: int):
+    documents = []
+    for batch in dict_batches(runs, batch_size):
+        documents.extend(batch)
+    return runs_to_points(documents)
+
+
+def load_columnar(runs: Dict[str, np.ndarray], batch_size: int):
+    starts, ends, prices = [], [], []
+    for batch in columnar_batches(runs, batch_size):
+        starts.append(np.fromiter((doc['t'] for doc in batch), np.int64, len(batch)))
+        ends.append(np.fromiter((doc['e'] for doc in batch), np.int64, len(batch)))
+        prices.append(np.fromiter((doc['p'] for doc in batch), np.float32, len(batch)))
+    return runs_to_series(np.concatenate(starts), np.concatenate(ends), np.concatenate(prices))
+
+
+def measure(load: Callable, runs: Dict[str, np.ndarray], batch_size: int,
+            predictor: PricePredictor) -> Dict[str, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    history = load(runs, batch_size)
+    loaded = time.perf_counter()
+    _, load_peak = tracemalloc.get_traced_memory()
+    retained, _ = tracemalloc.get_traced_memory()
+
+    tracemalloc.reset_peak()
+    predictor.get_price_insights(history)
+    predictor.predict_prices(history, mode='fast')
+    finished = time.perf_counter()
+    _, predict_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'points': len(history),
+        'load_ms': (loaded - started) * 1000,
+        'predict_ms': (finished - loaded) * 1000,
+        'retained_mb': retained / 2**20,
+        'peak_mb': max(load_peak, predict_peak) / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=10_000, help='cursor batch size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    runs = generate_runs(args.points, np.random.default_rng(args.seed))
+    predictor = PricePredictor(mode='fast')
+    results = {
+        'dicts': measure(load_dicts, runs, args.batch_size, predictor),
+        'columnar': measure(load_columnar, runs, args.batch_size, predictor),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'handoff':<10} {'points':>8} {'load ms':>9} {'predict ms':>11} {'retained MB':>12} {'peak MB':>9}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['points']:>8} {r['load_ms']:>9.1f} {r['predict_ms']:>11.1f} "
+              f"{r['retained_mb']:>12.2f} {r['peak_mb']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
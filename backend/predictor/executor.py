@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Set
+import asyncio
+import os
+import signal
+
+
+class ForecastQueueFull(Exception):
+    """Raised when a forecast job could not be queued in time."""
+
+
+class _Worker:
+    """One forecasting process, so a runaway job can be stopped without touching the others."""
+
+    def __init__(self):
+        self.pool = ProcessPoolExecutor(max_workers=1)
+        self.pid: Optional[int] = None
+
+    async def start(self) -> None:
+        self.pid = await asyncio.wrap_future(self.pool.submit(os.getpid))
+
+    def kill(self) -> None:
+        if self.pid is not None:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass  # already gone
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ForecastExecutor:
+    """Runs forecast jobs in worker processes so model fits never block the event loop.
+
+    At most `max_pending` jobs may be queued or running; callers beyond that
+    wait up to `queue_timeout` seconds for a slot and are then rejected.
+    Each job must finish within `timeout` seconds. Every worker is its own
+    single-process pool: a job that runs over time has its process killed
+    and replaced, which frees its slot without failing jobs on other workers.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 timeout: Optional[float] = None, queue_timeout: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv('FORECAST_WORKERS', str(os.cpu_count() or 1)))
+        self.max_pending = max_pending or int(os.getenv('FORECAST_MAX_PENDING', str(self.max_workers * 4)))
+        self.timeout = timeout or float(os.getenv('FORECAST_TIMEOUT_SECONDS', '60'))
+        self.queue_timeout = queue_timeout or float(os.getenv('FORECAST_QUEUE_TIMEOUT_SECONDS', '10'))
+
+        self._workers: Set[_Worker] = set()
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._stats = {'completed': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0}
+
+    async def _take(self) -> _Worker:
+        """An idle worker, starting one while fewer than max_workers exist."""
+        if self._idle.empty() and len(self._workers) < self.max_workers:
+            worker = _Worker()
+            self._workers.add(worker)
+            return worker
+        return await self._idle.get()
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        self._workers.discard(worker)
+        # Hand the place to a fresh worker so callers waiting on _idle get one
+        fresh = _Worker()
+        self._workers.add(fresh)
+        self._idle.put_nowait(fresh)
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        worker = await self._take()
+        try:
+            if worker.pid is None:
+                await worker.start()
+            result = await asyncio.wrap_future(worker.pool.submit(fn, *args))
+        except (asyncio.CancelledError, BrokenProcessPool):
+            # Timed out, abandoned by the caller or the process died
+            self._replace(worker)
+            raise
+        except BaseException:
+            self._idle.put_nowait(worker)
+            raise
+        self._idle.put_nowait(worker)
+        return result
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run `fn(*args)` in a worker process and return its result."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats['rejected'] += 1
+            raise ForecastQueueFull(f"Forecast queue full ({self.max_pending} jobs pending)")
+
+        try:
+            result = await asyncio.wait_for(self._run(fn, *args), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats['timed_out'] += 1
+            raise TimeoutError(f"Forecast did not finish within {self.timeout:.0f}s")
+        except Exception:
+            self._stats['failed'] += 1
+            raise
+        finally:
+            # The job's worker is idle again or killed by now
+            self._slots.release()
+
+        self._stats['completed'] += 1
+        return result
+
+    async def prewarm(self, fn: Callable) -> None:
+        """Start every worker process by running `fn()` once per worker."""
+        await asyncio.gather(*(self.run(fn) for _ in range(self.max_workers)))
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'max_workers': self.max_workers, 'max_pending': self.max_pending}
+
+    def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.pool.shutdown(wait=False, cancel_futures=True)
+        self._workers.clear()
+        self._idle = asyncio.Queue()
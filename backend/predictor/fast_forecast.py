@@ -0,0 +1,134 @@
+from datetime import date
+from typing import Dict, List, Tuple
+import numpy as np
+
+from predictor.recommendation import summarize_batch, summarize_forecast
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class FastForecaster:
+    """Damped-trend exponential smoothing over a daily, forward-filled price series.
+
+    Pure NumPy and a single pass over the data, so it answers in well under
+    a millisecond for the sparse, step-shaped series we store. Returns the
+    same shape as PricePredictor.predict_prices.
+    """
+
+    def __init__(self, alpha: float = 0.5, beta: float = 0.1, phi: float = 0.9):
+        self.alpha = alpha  # level smoothing
+        self.beta = beta    # trend smoothing
+        self.phi = phi      # trend damping, < 1 flattens long horizons
+
+    @staticmethod
+    def daily_series(history: List[Dict]) -> Tuple[np.datetime64, np.ndarray, np.ndarray]:
+        """Resample history to one price per day (last seen wins, gaps carried forward).
+
+        Returns the first day, the daily prices and the raw prices. `history`
+        is a list of {'date', 'price'} points or a columnar series with
+        epoch-millisecond `timestamps` and `prices` arrays.
+        """
+        if hasattr(history, 'timestamps'):
+            dates = history.timestamps.astype('datetime64[ms]').astype('datetime64[D]')
+            prices = history.prices.astype(float)
+        else:
+            columns = [tuple(point.values()) for point in history]
+            if hasattr(columns[0][0], 'toordinal'):
+                # datetime/date objects: day ordinals are much cheaper than datetime64 conversion
+                ordinals = np.array([column[0].toordinal() for column in columns])
+                dates = (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+            else:
+                dates = np.array([column[0] for column in columns], dtype='datetime64[D]')
+            prices = np.array([column[1] for column in columns], dtype=float)
+        order = np.argsort(dates, kind='stable')
+        dates, prices = dates[order], prices[order]
+
+        offsets = (dates - dates[0]).astype(np.int64)
+        daily = np.full(offsets[-1] + 1, np.nan)
+        daily[offsets] = prices
+
+        # Forward-fill days without a sample
+        filled = np.where(np.isnan(daily), 0, np.arange(len(daily)))
+        np.maximum.accumulate(filled, out=filled)
+        return dates[0], daily[filled], prices
+
+    def forecast(self, values: np.ndarray, days_ahead: int) -> np.ndarray:
+        """Forecast `days_ahead` daily values following `values`."""
+        level = values[0]
+        trend = values[1] - values[0] if len(values) > 1 else 0.0
+
+        for value in values[1:]:
+            previous_level = level
+            level = self.alpha * value + (1 - self.alpha) * (level + self.phi * trend)
+            trend = self.beta * (level - previous_level) + (1 - self.beta) * self.phi * trend
+
+        damping = np.cumsum(self.phi ** np.arange(1, days_ahead + 1))
+        return level + damping * trend
+
+    def predict_prices(self, history: List[Dict], days_ahead: int = 7) -> Dict:
+        """Predict future prices and provide buy/wait recommendation."""
+        if len(history) < 2:
+            raise ValueError("Insufficient price history for prediction")
+
+        start, daily, prices = self.daily_series(history)
+        predicted_prices = self.forecast(daily, days_ahead)
+
+        last_day = start + np.timedelta64(len(daily) - 1, 'D')
+        predicted_dates = [str(last_day + np.timedelta64(day, 'D')) for day in range(1, days_ahead + 1)]
+
+        return summarize_forecast(prices, predicted_dates, predicted_prices)
+
+    def forecast_batch(self, values: np.ndarray, lengths: np.ndarray, days_ahead: int) -> np.ndarray:
+        """Vectorized `forecast` over a (products, days) matrix padded on the right.
+
+        Loops over days once and updates every product per step; rows stop
+        updating once their own series has ended.
+        """
+        level = values[:, 0].copy()
+        trend = np.where(lengths > 1, values[:, min(1, values.shape[1] - 1)] - values[:, 0], 0.0)
+
+        for day in range(1, values.shape[1]):
+            active = day < lengths
+            new_level = self.alpha * values[:, day] + (1 - self.alpha) * (level + self.phi * trend)
+            new_trend = self.beta * (new_level - level) + (1 - self.beta) * self.phi * trend
+            level = np.where(active, new_level, level)
+            trend = np.where(active, new_trend, trend)
+
+        damping = np.cumsum(self.phi ** np.arange(1, days_ahead + 1))
+        return level[:, None] + damping[None, :] * trend[:, None]
+
+    def predict_batch(self, histories: Dict[str, List[Dict]], days_ahead: int = 7) -> Dict[str, Dict]:
+        """predict_prices for many products in vectorized passes.
+
+        Histories with fewer than two points are skipped.
+        """
+        keys = [key for key, history in histories.items() if len(history) >= 2]
+        if not keys:
+            return {}
+
+        series = [self.daily_series(histories[key]) for key in keys]
+        day_counts = np.array([len(daily) for _, daily, _ in series])
+        point_counts = np.array([len(prices) for _, _, prices in series])
+
+        # Pack into right-padded matrices
+        daily = np.zeros((len(keys), day_counts.max()))
+        prices = np.zeros((len(keys), point_counts.max()))
+        for row, (_, product_daily, product_prices) in enumerate(series):
+            daily[row, :len(product_daily)] = product_daily
+            prices[row, :len(product_prices)] = product_prices
+
+        predicted = self.forecast_batch(daily, day_counts, days_ahead)
+        summary = summarize_batch(prices, point_counts, predicted)
+
+        last_days = np.array([start for start, _, _ in series]) + (day_counts - 1).astype('timedelta64[D]')
+        dates = np.datetime_as_string(last_days[:, None] + np.arange(1, days_ahead + 1).astype('timedelta64[D]'))
+
+        return {
+            key: {
+                'dates': dates[row].tolist(),
+                'prices': predicted[row].tolist(),
+                'recommendation': str(summary['recommendation'][row]),
+                'confidence': float(summary['confidence'][row])
+            }
+            for row, key in enumerate(keys)
+        }
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class ForecastCache:
+    """Bounded LRU of forecasts per URL, tagged with the history version they came from.
+
+    A forecast is only served while the stored history version (latest
+    timestamp and point count) still matches, so stale entries are never
+    returned even if an invalidation is missed.
+    """
+
+    def __init__(self, max_size: int = 500):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, url: str, version: Hashable, key: Hashable) -> Optional[Dict]:
+        """Return the forecast stored under `key` (e.g. days ahead and mode) for this version."""
+        entry = self._entries.get(url)
+        if entry is None or entry['version'] != version or key not in entry['forecasts']:
+            self._stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(url)
+        self._stats['hits'] += 1
+        return entry['forecasts'][key]
+
+    def put(self, url: str, version: Hashable, key: Hashable, forecast: Dict) -> None:
+        entry = self._entries.get(url)
+        if entry is None or entry['version'] != version:
+            entry = self._entries[url] = {'version': version, 'forecasts': {}}
+        entry['forecasts'][key] = forecast
+
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, url: str) -> None:
+        if self._entries.pop(url, None) is not None:
+            self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'size': len(self._entries)}
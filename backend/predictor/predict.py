@@ -1,13 +1,74 @@
-from prophet import Prophet
-import matplotlib.pyplot as plt
 import pandas as pd
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict, Hashable, Optional, Tuple
 from datetime import datetime, timedelta
+import asyncio
 import numpy as np
+import os
+import time
+
+from monitoring.metrics import record_stage, stage, start_profile
+from predictor.executor import ForecastExecutor
+from predictor.fast_forecast import FastForecaster
+from predictor.forecast_cache import ForecastCache
+from predictor.recommendation import summarize_forecast
+
+if TYPE_CHECKING:
+    from prophet import Prophet
+
+MODES = ('fast', 'prophet', 'auto')
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _forecast_job(history: List[Dict], days_ahead: int) -> Tuple[Dict, List[Tuple[str, float]]]:
+    """Process pool entry point; builds its own predictor (and model) per job.
+
+    Returns the prediction and the job's stage timings, which would
+    otherwise only reach this process's metrics.
+    """
+    stages = start_profile()
+    return PricePredictor().predict_prices(history, days_ahead, mode='prophet'), stages
+
+def _warm_worker() -> None:
+    """Process pool entry point that only pays Prophet's import cost."""
+    PricePredictor._build_model()
 
 class PricePredictor:
-    def __init__(self):
-        self.model = Prophet(
+    # Stored history is resampled to this interval before forecasting
+    SAMPLE_INTERVAL = timedelta(days=1)
+
+    def __init__(self, cache_size: Optional[int] = None, executor: Optional[ForecastExecutor] = None,
+                 mode: str = 'prophet'):
+        if mode not in MODES:
+            raise ValueError(f"Unknown forecast mode: {mode}")
+        self.mode = mode
+        self.fast = FastForecaster()
+        # Below this many points, or under a tighter SLA than a typical
+        # Prophet fit, 'auto' uses the fast forecaster
+        self.prophet_min_points = int(os.getenv('PROPHET_MIN_POINTS', '30'))
+        self.prophet_expected_ms = float(os.getenv('PROPHET_EXPECTED_MS', '2000'))
+        self.cache = ForecastCache(cache_size or int(os.getenv('FORECAST_CACHE_SIZE', '500')))
+        self.executor = executor or ForecastExecutor()
+        self._model: Optional['Prophet'] = None
+
+    @property
+    def model(self) -> 'Prophet':
+        """The last fitted model, or an unfitted one; Prophet is imported on first use."""
+        if self._model is None:
+            self._model = self._build_model()
+        return self._model
+
+    @model.setter
+    def model(self, model: 'Prophet') -> None:
+        self._model = model
+
+    @staticmethod
+    def _build_model() -> 'Prophet':
+        # Importing Prophet (and cmdstanpy, matplotlib) takes most of a
+        # second, so it waits until a model is actually needed
+        from prophet import Prophet
+
+        # Prophet models can only be fit once, so every fit gets a fresh one
+        return Prophet(
             daily_seasonality=True,
             weekly_seasonality=True,
             yearly_seasonality=False,
@@ -15,13 +76,42 @@ class PricePredictor:
         )
 
     def prepare_data(self, history: List[Dict]) -> pd.DataFrame:
-        """Convert price history to Prophet-compatible DataFrame."""
+        """Convert price history to Prophet-compatible DataFrame.
+
+        Accepts a list of {'date', 'price'} points or a columnar series with
+        epoch-millisecond `timestamps` and `prices` arrays.
+        """
+        if hasattr(history, 'timestamps'):
+            return pd.DataFrame({
+                'ds': pd.to_datetime(history.timestamps, unit='ms'),
+                'y': history.prices.astype(np.float64)
+            })
         df = pd.DataFrame(history)
         df.columns = ['ds', 'y']  # Prophet requires these column names
         return df
 
-    def predict_prices(self, history: List[Dict], days_ahead: int = 7) -> Dict:
+    def choose_mode(self, history: List[Dict], mode: Optional[str] = None,
+                    sla_ms: Optional[float] = None) -> str:
+        """Resolve 'auto' (or the predictor default) to 'fast' or 'prophet'."""
+        mode = mode or self.mode
+        if mode not in MODES:
+            raise ValueError(f"Unknown forecast mode: {mode}")
+        if mode != 'auto':
+            return mode
+
+        if len(history) < self.prophet_min_points:
+            return 'fast'
+        if sla_ms is not None and sla_ms < self.prophet_expected_ms:
+            return 'fast'
+        return 'prophet'
+
+    def predict_prices(self, history: List[Dict], days_ahead: int = 7,
+                       mode: Optional[str] = None, sla_ms: Optional[float] = None) -> Dict:
         """Predict future prices and provide buy/wait recommendation."""
+        if self.choose_mode(history, mode, sla_ms) == 'fast':
+            with stage('predict.fast'):
+                return self.fast.predict_prices(history, days_ahead)
+
         if len(history) < 5:
             raise ValueError("Insufficient price history for prediction")
 
@@ -29,39 +119,138 @@ class PricePredictor:
         df = self.prepare_data(history)
         
         # Fit model
-        self.model.fit(df)
+        with stage('predict.prophet_fit'):
+            self.model = self._build_model()
+            self.model.fit(df)
         
         # Create future dates for prediction
-        future_dates = self.model.make_future_dataframe(periods=days_ahead)
-        forecast = self.model.predict(future_dates)
+        with stage('predict.prophet_predict'):
+            future_dates = self.model.make_future_dataframe(periods=days_ahead)
+            forecast = self.model.predict(future_dates)
         
         # Extract relevant prediction data
-        current_price = df['y'].iloc[-1]
         predicted_prices = forecast['yhat'].tail(days_ahead).values
         predicted_dates = forecast['ds'].tail(days_ahead).dt.strftime('%Y-%m-%d').values
         
-        # Calculate trend and confidence
-        price_trend = np.mean(np.diff(predicted_prices))
-        forecast_std = np.std(predicted_prices)
-        current_std = np.std(df['y'].values)
-        confidence = 1 - min(forecast_std / current_std, 0.9)  # Cap at 90% confidence
-        
-        # Determine buy/wait recommendation
-        min_predicted_price = np.min(predicted_prices)
-        price_drop_expected = min_predicted_price < current_price
-        significant_drop = (current_price - min_predicted_price) / current_price > 0.05
-        
-        recommendation = 'wait' if price_drop_expected and significant_drop else 'buy'
-        
+        return summarize_forecast(df['y'].values, predicted_dates.tolist(), predicted_prices)
+
+    @staticmethod
+    def history_version(history: List[Dict]) -> Hashable:
+        """Identify a history by its length and latest timestamp in epoch milliseconds.
+
+        Point lists and columnar series of the same history get the same
+        version, so forecasts cached from one are served for the other.
+        """
+        if not len(history):
+            return (0, None)
+        if hasattr(history, 'timestamps'):
+            return (len(history), int(history.timestamps[-1]))
+        latest = next(iter(history[-1].values()))
+        if isinstance(latest, datetime):
+            # Stored dates are naive UTC with millisecond precision
+            latest = (latest - _EPOCH) // timedelta(milliseconds=1)
+        return (len(history), latest)
+
+    def predict_cached(self, url: str, history: List[Dict], days_ahead: int = 7,
+                       mode: Optional[str] = None, sla_ms: Optional[float] = None) -> Dict:
+        """Like predict_prices, but reuses the last forecast while the history is unchanged."""
+        mode = self.choose_mode(history, mode, sla_ms)
+        version = self.history_version(history)
+        prediction = self.cache.get(url, version, (days_ahead, mode))
+        if prediction is None:
+            prediction = self.predict_prices(history, days_ahead, mode)
+            self.cache.put(url, version, (days_ahead, mode), prediction)
+        return prediction
+
+    async def predict_async(self, history: List[Dict], days_ahead: int = 7,
+                            url: Optional[str] = None, mode: Optional[str] = None,
+                            sla_ms: Optional[float] = None) -> Dict:
+        """Run predict_prices without blocking the event loop.
+
+        Prophet fits go to the forecasting process pool; the fast forecaster
+        is cheap enough to run inline. With a `url`, the forecast cache is
+        consulted and filled as in predict_cached.
+        """
+        mode = self.choose_mode(history, mode, sla_ms)
+        version = self.history_version(history)
+        if url is not None:
+            prediction = self.cache.get(url, version, (days_ahead, mode))
+            if prediction is not None:
+                return prediction
+
+        if mode == 'fast':
+            with stage('predict.fast'):
+                prediction = self.fast.predict_prices(history, days_ahead)
+        else:
+            # Queueing plus the fit in a worker process
+            started = time.perf_counter()
+            with stage('predict.prophet_pool'):
+                prediction, stages = await self.executor.run(_forecast_job, history, days_ahead)
+            for name, seconds in stages:
+                record_stage(name, seconds)
+            # What the pool added on top of the job: queueing and pickling
+            record_stage('predict.prophet_wait',
+                         max(0.0, time.perf_counter() - started - sum(seconds for _, seconds in stages)))
+        if url is not None:
+            self.cache.put(url, version, (days_ahead, mode), prediction)
+        return prediction
+
+    def predict_batch(self, histories: Dict[str, List[Dict]], days_ahead: int = 7) -> Dict[str, Dict]:
+        """Fast-mode forecasts for many products at once, keyed like `histories`."""
+        return self.fast.predict_batch(histories, days_ahead)
+
+    async def recompute_forecasts(self, histories: Dict[str, List[Dict]], days_ahead: int = 7) -> Dict:
+        """Bulk-refresh cached forecasts in the mode reads will ask for and report throughput.
+
+        Each product is forecast in the mode choose_mode picks for its
+        history, so predict_async finds it cached. Fast-mode products go
+        through one vectorized batch; Prophet fits run in the forecasting
+        processes, at most one per worker so API requests can still queue.
+        """
+        started = time.perf_counter()
+        modes = {url: self.choose_mode(history) for url, history in histories.items()}
+        fast = {url: history for url, history in histories.items() if modes[url] == 'fast'}
+        with stage('predict.batch'):
+            predictions = self.predict_batch(fast, days_ahead)
+        for url, prediction in predictions.items():
+            self.cache.put(url, self.history_version(histories[url]), (days_ahead, 'fast'), prediction)
+
+        workers = asyncio.Semaphore(self.executor.max_workers)
+
+        async def fit(url: str) -> None:
+            async with workers:
+                await self.predict_async(histories[url], days_ahead, url=url, mode='prophet')
+
+        prophet = [url for url, mode in modes.items() if mode == 'prophet']
+        results = await asyncio.gather(*(fit(url) for url in prophet), return_exceptions=True)
+        failed = sum(isinstance(result, Exception) for result in results)
+        elapsed = time.perf_counter() - started
+
+        forecasts = len(predictions) + len(prophet) - failed
         return {
-            'dates': predicted_dates.tolist(),
-            'prices': predicted_prices.tolist(),
-            'recommendation': recommendation,
-            'confidence': float(confidence)
+            'products': len(histories),
+            'forecasts': forecasts,
+            'prophet': len(prophet),
+            'failed': failed,
+            'seconds': elapsed,
+            'products_per_sec': forecasts / elapsed if elapsed > 0 else float('inf')
         }
+
+    def invalidate(self, url: str) -> None:
+        """Drop cached forecasts for a product, e.g. after a new price point."""
+        self.cache.invalidate(url)
+
+    async def prewarm(self) -> None:
+        """Import Prophet here and start the forecasting processes ahead of the first fit."""
+        await asyncio.get_running_loop().run_in_executor(None, self._build_model)
+        if self.mode != 'fast':
+            await self.executor.prewarm(_warm_worker)
+
     def plot_forecast(self, history: List[Dict], days_ahead: int = 7):
+        import matplotlib.pyplot as plt
 
         df = self.prepare_data(history)
+        self.model = self._build_model()
         self.model.fit(df)
         future = self.model.make_future_dataframe(periods=days_ahead)
         forecast = self.model.predict(future)
@@ -73,6 +262,20 @@ class PricePredictor:
         plt.tight_layout()
         return fig
 
+    @staticmethod
+    def insights_from_stats(stats: Dict) -> Dict:
+        """Same shape as get_price_insights, from the running stats kept on a product."""
+        count = stats['count']
+        return {
+            'current_price': stats['last'],
+            'average_price': stats['mean'],
+            'highest_price': stats['max'],
+            'lowest_price': stats['min'],
+            # Sample standard deviation, matching pandas' default
+            'price_volatility': (stats['m2'] / (count - 1)) ** 0.5 if count > 1 else None,
+            'total_price_change': (stats['last'] - stats['first']) / stats['first'] * 100
+        }
+
     def get_price_insights(self, history: List[Dict]) -> Dict:
         """Generate additional insights about price patterns."""
         df = self.prepare_data(history)
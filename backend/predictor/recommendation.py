@@ -0,0 +1,66 @@
+from typing import Dict, List
+import numpy as np
+
+
+def _denoise(std, price):
+    """Treat floating-point noise on a flat series as zero spread."""
+    return np.where(std > 1e-9 * np.abs(price), std, 0.0)
+
+
+def summarize_forecast(history_prices: np.ndarray, predicted_dates: List[str],
+                       predicted_prices: np.ndarray) -> Dict:
+    """Turn a forecast into the API's dates/prices/recommendation/confidence shape."""
+    current_price = history_prices[-1]
+
+    # Confidence falls as the forecast spreads relative to the history
+    forecast_std = _denoise(np.std(predicted_prices), current_price)
+    current_std = _denoise(np.std(history_prices), current_price)
+    if current_std > 0:
+        ratio = forecast_std / current_std
+    else:
+        ratio = 0.0 if forecast_std == 0 else 0.9
+    confidence = 1 - min(ratio, 0.9)  # Cap at 90% confidence
+
+    # Determine buy/wait recommendation
+    min_predicted_price = np.min(predicted_prices)
+    price_drop_expected = min_predicted_price < current_price
+    significant_drop = (current_price - min_predicted_price) / current_price > 0.05
+
+    recommendation = 'wait' if price_drop_expected and significant_drop else 'buy'
+
+    return {
+        'dates': list(predicted_dates),
+        'prices': [float(price) for price in predicted_prices],
+        'recommendation': recommendation,
+        'confidence': float(confidence)
+    }
+
+
+def summarize_batch(history_prices: np.ndarray, counts: np.ndarray,
+                    predicted_prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorized summarize_forecast over many products at once.
+
+    `history_prices` is a (products, points) matrix padded on the right;
+    `counts` holds the number of real points in each row.
+    """
+    rows = np.arange(len(counts))
+    mask = np.arange(history_prices.shape[1])[None, :] < counts[:, None]
+    current_price = history_prices[rows, counts - 1]
+
+    mean = np.where(mask, history_prices, 0).sum(axis=1) / counts
+    current_std = np.sqrt(np.where(mask, (history_prices - mean[:, None]) ** 2, 0).sum(axis=1) / counts)
+    current_std = _denoise(current_std, current_price)
+    forecast_std = _denoise(predicted_prices.std(axis=1), current_price)
+
+    safe_std = np.where(current_std > 0, current_std, 1)
+    ratio = np.where(current_std > 0, forecast_std / safe_std, np.where(forecast_std == 0, 0.0, 0.9))
+    confidence = 1 - np.minimum(ratio, 0.9)
+
+    min_predicted_price = predicted_prices.min(axis=1)
+    price_drop_expected = min_predicted_price < current_price
+    significant_drop = (current_price - min_predicted_price) / current_price > 0.05
+
+    return {
+        'recommendation': np.where(price_drop_expected & significant_drop, 'wait', 'buy'),
+        'confidence': confidence
+    }
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from predictor.executor import ForecastExecutor
+
+def test_timeout_kills_only_the_slow_job():
+    executor = ForecastExecutor(max_workers=2, max_pending=2, timeout=1, queue_timeout=5)
+
+    async def run():
+        try:
+            await executor.prewarm(os.getpid)
+            slow = asyncio.create_task(executor.run(time.sleep, 10))
+            await asyncio.sleep(0.6)
+            # Runs alongside the slow job and outlives its deadline
+            quick = await executor.run(time.sleep, 0.8)
+            with pytest.raises(TimeoutError):
+                await slow
+            return quick
+        finally:
+            executor.shutdown()
+
+    started = time.perf_counter()
+    quick = asyncio.run(run())
+    assert quick is None
+    assert time.perf_counter() - started < 5
+    assert executor.stats()['timed_out'] == 1 and executor.stats()['failed'] == 0
+
+def test_timed_out_job_frees_its_slot_for_a_fresh_worker():
+    executor = ForecastExecutor(max_workers=1, max_pending=1, timeout=0.5, queue_timeout=5)
+
+    async def run():
+        try:
+            before = await executor.run(os.getpid)
+            with pytest.raises(TimeoutError):
+                await executor.run(time.sleep, 30)
+            return before, await executor.run(os.getpid)
+        finally:
+            executor.shutdown()
+
+    before, after = asyncio.run(run())
+    assert after != before
+    assert executor.stats()['completed'] == 2
+
+def test_crashed_worker_is_replaced():
+    executor = ForecastExecutor(max_workers=1, timeout=10)
+
+    async def run():
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await executor.run(os._exit, 1)
+            return await executor.run(abs, -3)
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(run()) == 3
+    assert executor.stats()['failed'] == 1
@@ -1,4 +1,5 @@
 from prophet import Prophet  
+import asyncio
 import pytest
 from predict import PricePredictor
 from datetime import datetime, timedelta
@@ -45,6 +46,119 @@ def test_insights(predictor, sample_history):
     assert insights['highest_price'] == 110
     assert insights['lowest_price'] == 100
 
+def test_insights_from_stats_matches_history(predictor, sample_history):
+    prices = [point['y'] for point in sample_history]
+    mean = np.mean(prices)
+    stats = {
+        'count': len(prices),
+        'mean': mean,
+        'm2': float(np.sum((np.array(prices) - mean) ** 2)),
+        'min': min(prices),
+        'max': max(prices),
+        'first': prices[0],
+        'last': prices[-1]
+    }
+    expected = predictor.get_price_insights(sample_history)
+    insights = predictor.insights_from_stats(stats)
+    for key, value in expected.items():
+        assert insights[key] == pytest.approx(value)
+
+def test_predict_cached_reuses_forecast(predictor, sample_history, monkeypatch):
+    calls = []
+    original = predictor.predict_prices
+    monkeypatch.setattr(predictor, 'predict_prices', lambda *args: calls.append(1) or original(*args))
+
+    first = predictor.predict_cached('https://example.com/p', sample_history)
+    second = predictor.predict_cached('https://example.com/p', sample_history)
+    assert second is first
+    assert len(calls) == 1
+
+    predictor.invalidate('https://example.com/p')
+    predictor.predict_cached('https://example.com/p', sample_history)
+    assert len(calls) == 2
+
+def test_predict_cached_refits_on_new_point(predictor, sample_history):
+    first = predictor.predict_cached('https://example.com/p', sample_history)
+    longer = sample_history + [{'ds': datetime(2023,1,6), 'y': 108}]
+    second = predictor.predict_cached('https://example.com/p', longer)
+    assert second is not first
+
+def test_predict_async(predictor, sample_history):
+    from monitoring.metrics import start_profile
+
+    async def run():
+        try:
+            profile = start_profile()
+            first = await predictor.predict_async(sample_history, url='https://example.com/p')
+            second = await predictor.predict_async(sample_history, url='https://example.com/p')
+            return first, second, profile
+        finally:
+            predictor.executor.shutdown()
+
+    first, second, profile = asyncio.run(run())
+    # Stages timed in the worker process are reported here too
+    assert [name for name, _ in profile] == [
+        'predict.prophet_pool', 'predict.prophet_fit', 'predict.prophet_predict', 'predict.prophet_wait'
+    ]
+    assert first['recommendation'] in ['buy', 'wait']
+    assert len(first['prices']) == 7
+    assert second is first
+    assert predictor.executor.stats()['completed'] == 1
+
+def test_predict_prices_fast(predictor, sample_history):
+    result = predictor.predict_prices(sample_history, mode='fast')
+    assert result['dates'][0] == '2023-01-06'
+    assert len(result['prices']) == 7
+    assert result['recommendation'] in ['buy', 'wait']
+    assert 0 <= result['confidence'] <= 1
+
+def test_fast_forecaster_flat_history(predictor):
+    history = [{'ds': datetime(2023,1,1), 'y': 100}, {'ds': datetime(2023,1,5), 'y': 100}]
+    result = predictor.predict_prices(history, mode='fast')
+    assert result['prices'] == pytest.approx([100] * 7)
+    assert result['recommendation'] == 'buy'
+    assert result['confidence'] == pytest.approx(1)
+
+def test_choose_mode(predictor, sample_history):
+    assert predictor.choose_mode(sample_history) == 'prophet'
+    assert predictor.choose_mode(sample_history, 'auto') == 'fast'
+    long_history = generate_test_data(days=60)
+    assert predictor.choose_mode(long_history, 'auto') == 'prophet'
+    assert predictor.choose_mode(long_history, 'auto', sla_ms=50) == 'fast'
+    with pytest.raises(ValueError):
+        predictor.choose_mode(sample_history, 'unknown')
+
+def test_predict_batch_matches_single(predictor, sample_history):
+    histories = {
+        'a': sample_history,
+        'b': [{'ds': datetime(2023,1,1), 'y': 50}, {'ds': datetime(2023,1,9), 'y': 40}],
+        'short': sample_history[:1]
+    }
+    batch = predictor.predict_batch(histories)
+    assert set(batch) == {'a', 'b'}
+    for key in batch:
+        single = predictor.predict_prices(histories[key], mode='fast')
+        assert batch[key]['dates'] == single['dates']
+        assert batch[key]['prices'] == pytest.approx(single['prices'])
+        assert batch[key]['recommendation'] == single['recommendation']
+        assert batch[key]['confidence'] == pytest.approx(single['confidence'])
+
+def test_columnar_history(predictor, sample_history):
+    from database.history import PriceSeries
+    series = PriceSeries(
+        [int((p['ds'] - datetime(1970,1,1)).total_seconds() * 1000) for p in sample_history],
+        [p['y'] for p in sample_history]
+    )
+    df = predictor.prepare_data(series)
+    assert list(df.columns) == ['ds', 'y']
+    assert df['ds'].tolist() == [p['ds'] for p in sample_history]
+    assert predictor.history_version(series)[0] == 5
+
+    columnar = predictor.predict_prices(series, mode='fast')
+    expected = predictor.predict_prices(sample_history, mode='fast')
+    assert columnar['dates'] == expected['dates']
+    assert columnar['prices'] == pytest.approx(expected['prices'])
+
 def generate_test_data(days=30, base_price=100):
     """Generate synthetic price data for testing"""
     dates = [datetime.now() - timedelta(days=x) for x in range(days)]
@@ -0,0 +1,155 @@
+from datetime import timedelta
+from typing import Dict, List, Optional
+import asyncio
+import os
+
+from database.bulk_writer import BulkPriceWriter
+from database.db import Database
+from predictor.predict import PricePredictor
+from scraper.price_cache import shared_cache
+from scraper.canonical import canonical_url
+from scraper.registry import get_scraper, site_for
+
+
+class _DomainLimiter:
+    """Caps concurrent scrapes against one site and spaces out their start times."""
+
+    def __init__(self, concurrency: int, min_delay: float):
+        self.min_delay = min_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.min_delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+
+class RefreshScheduler:
+    """Periodically re-scrapes due products and records their prices.
+
+    Every tracked product is scraped at most once per interval no matter
+    how many users watch it; results are batched into
+    `Database.update_prices_bulk` so history and current price stay in sync.
+    A product whose scrape fails is held back for `retry_after` instead of
+    being due again on the next poll.
+    """
+
+    def __init__(self, db: Database, predictor: Optional[PricePredictor] = None,
+                 interval: Optional[timedelta] = None,
+                 concurrency: Optional[int] = None, per_domain: Optional[int] = None,
+                 domain_delay: Optional[float] = None, poll_seconds: Optional[float] = None,
+                 retry_after: Optional[timedelta] = None):
+        self.db = db
+        self.predictor = predictor
+        self.interval = interval or timedelta(minutes=int(os.getenv('REFRESH_INTERVAL_MINUTES', '60')))
+        self.concurrency = concurrency or int(os.getenv('REFRESH_CONCURRENCY', '8'))
+        self.per_domain = per_domain or int(os.getenv('REFRESH_PER_DOMAIN', '2'))
+        self.domain_delay = domain_delay if domain_delay is not None else float(os.getenv('REFRESH_DOMAIN_DELAY', '2'))
+        self.poll_seconds = poll_seconds or float(os.getenv('REFRESH_POLL_SECONDS', '60'))
+        self.retry_after = retry_after or timedelta(minutes=int(os.getenv('REFRESH_RETRY_MINUTES', '15')))
+
+        self.writer = BulkPriceWriter(db)
+
+        self._global = asyncio.Semaphore(self.concurrency)
+        self._domains: Dict[str, _DomainLimiter] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {'sweeps': 0, 'scraped': 0, 'failed': 0, 'skipped': 0}
+
+    def start(self) -> None:
+        """Start the background refresh loop."""
+        if self._task is None:
+            self.writer.start()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the refresh loop and wait for it to finish."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.writer.stop()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Scrape every product that is due and return the sweep counters."""
+        products = await self.db.get_products_to_check(self.interval)
+        results = await asyncio.gather(*(self._refresh(product) for product in products))
+
+        # Write whatever the sweep left in the buffer before using it
+        write_errors = await self.writer.flush()
+
+        self._stats['sweeps'] += 1
+        summary = {'due': len(products), 'scraped': 0, 'failed': 0, 'skipped': 0}
+        for outcome in results:
+            summary[outcome] += 1
+            self._stats[outcome] += 1
+        if write_errors:
+            summary['write_errors'] = len(write_errors)
+
+        refreshed = [product['url'] for product, outcome in zip(products, results)
+                     if outcome == 'scraped' and product['url'] not in write_errors]
+        if self.predictor is not None and refreshed:
+            summary['forecasts'] = await self.recompute_forecasts(refreshed)
+        return summary
+
+    async def recompute_forecasts(self, urls: List[str]) -> Dict:
+        """Refresh cached forecasts for freshly scraped products."""
+        histories = await self.db.get_price_histories(urls, self.predictor.SAMPLE_INTERVAL)
+        return await self.predictor.recompute_forecasts(histories)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                summary = await self.run_once()
+                if summary['due']:
+                    print(f"Price refresh: {summary}")
+            except Exception as e:
+                print(f"Error during price refresh: {str(e)}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def _limiter(self, site: str) -> _DomainLimiter:
+        if site not in self._domains:
+            self._domains[site] = _DomainLimiter(self.per_domain, self.domain_delay)
+        return self._domains[site]
+
+    async def _refresh(self, product: Dict) -> str:
+        # Same cache key as the API, also for products stored before canonical URLs
+        url = canonical_url(product['url'])
+        site = site_for(url)
+        if site is None:
+            return 'skipped'
+
+        # Wait for the site's slot before taking a global one so a slow
+        # site cannot starve the others
+        price = None
+        async with self._limiter(site):
+            async with self._global:
+                try:
+                    # Always scrape (max_age=0) but still join an in-flight
+                    # scrape and refresh the cache for the API
+                    scraper = get_scraper(url)
+                    price = await shared_cache.get_or_fetch(url, lambda: scraper.get_price(url), max_age=0)
+                except Exception as e:
+                    print(f"Error refreshing {url}: {str(e)}")
+
+        if price is None:
+            # Blocked or dead pages would otherwise be due again on the next poll
+            await self.db.defer_product(url, self.retry_after)
+            return 'failed'
+
+        await self.writer.add(url, price)
+        return 'scraped'
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+import mongomock_motor
+from database.history import runs_to_points, runs_to_series
+from predictor.predict import PricePredictor
+import scheduler.refresh
+from database.db import Database
+from scheduler.refresh import RefreshScheduler
+
+URL = 'https://www.amazon.in/dp/B000000001'
+RUNS = [
+    {'price': 100.0, 'timestamp': datetime(2023,1,1,8,30,0,125000), 'last_seen': datetime(2023,1,3,9)},
+    {'price': 90.0, 'timestamp': datetime(2023,1,4,10), 'last_seen': datetime(2023,1,6,11,15,0,250000)},
+]
+
+class FakeDB:
+    async def get_price_histories(self, urls, resample=None):
+        return {url: runs_to_points(RUNS, resample) for url in urls}
+
+def series(resample):
+    ms = lambda d: (d - datetime(1970,1,1)) // timedelta(milliseconds=1)
+    return runs_to_series(np.array([ms(r['timestamp']) for r in RUNS]),
+                          np.array([ms(r['last_seen']) for r in RUNS]),
+                          np.array([r['price'] for r in RUNS]), resample)
+
+def test_precomputed_forecast_is_served_to_the_api():
+    predictor = PricePredictor(mode='auto')
+    scheduler = RefreshScheduler(FakeDB(), predictor)
+
+    async def run():
+        await scheduler.recompute_forecasts([URL])
+        # What /api/predict and /api/track load
+        return await predictor.predict_async(series(predictor.SAMPLE_INTERVAL), url=URL)
+
+    misses = predictor.cache.stats()['misses']
+    prediction = asyncio.run(run())
+    assert predictor.cache.stats()['hits'] == 1
+    assert predictor.cache.stats()['misses'] == misses
+    assert prediction['recommendation'] in ['buy', 'wait']
+    assert predictor.executor.stats()['completed'] == 0
+
+def test_precomputed_prophet_forecast_is_served_to_the_api():
+    predictor = PricePredictor(mode='auto')
+    # Enough history for auto mode to pick Prophet
+    predictor.prophet_min_points = 5
+    scheduler = RefreshScheduler(FakeDB(), predictor)
+
+    async def run():
+        try:
+            summary = await scheduler.recompute_forecasts([URL])
+            return summary, await predictor.predict_async(series(predictor.SAMPLE_INTERVAL), url=URL)
+        finally:
+            predictor.executor.shutdown()
+
+    summary, prediction = asyncio.run(run())
+    assert summary['prophet'] == 1 and summary['forecasts'] == 1
+    assert predictor.cache.stats()['hits'] == 1
+    # Only the sweep fitted a model
+    assert predictor.executor.stats()['completed'] == 1
+    assert prediction['recommendation'] in ['buy', 'wait']
+
+class BlockedScraper:
+    async def get_price(self, url):
+        raise RuntimeError('captcha')
+
+def test_failed_scrape_is_held_back(monkeypatch):
+    monkeypatch.setattr(scheduler.refresh, 'get_scraper', lambda url: BlockedScraper())
+    db = Database(client=mongomock_motor.AsyncMongoMockClient())
+    refresh = RefreshScheduler(db, interval=timedelta(hours=1), domain_delay=0)
+
+    async def run():
+        await db.add_tracked_product(URL, 'Phone', 80, 100)
+        await db.products.update_one({}, {'$set': {'last_checked': datetime.utcnow() - timedelta(days=1)}})
+        first = await refresh.run_once()
+        second = await refresh.run_once()
+        return first, second, await db.products.find_one({})
+
+    first, second, product = asyncio.run(run())
+    assert first['failed'] == 1
+    assert second['due'] == 0
+    assert product['lease_expires'] > datetime.utcnow() + timedelta(minutes=14)
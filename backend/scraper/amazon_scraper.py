@@ -1,82 +1,103 @@
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 import re
 from typing import Optional
 
+from scraper.browser_pool import BrowserPool, shared_pool
+from scraper.http_fetcher import HttpFetcher, shared_fetcher
+from monitoring.metrics import stage
+from scraper.snapshot import take_snapshot
+
 class AmazonScraper:
-    def __init__(self):
+    SELECTORS = {
+        'price': '.a-price-whole',
+        'price_fraction': '.a-price-fraction',
+        'title': '#productTitle',
+        'rating': '.a-icon-star-small',
+        'availability': '#availability',
+        'image_url': '#landingImage'
+    }
+    # The price is server-rendered, so the DOM being parsed is enough;
+    # waiting for networkidle mostly waits on ads and trackers
+    WAIT_UNTIL = 'domcontentloaded'
+    PRICE_TIMEOUT_MS = 5000
+
+    def __init__(self, pool: Optional[BrowserPool] = None, fetcher: Optional[HttpFetcher] = None):
+        self.pool = pool or shared_pool
+        self.fetcher = fetcher or shared_fetcher
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
+    @staticmethod
+    def parse_price(whole: Optional[str], fraction: Optional[str] = None) -> Optional[float]:
+        """Combine the whole and fraction price texts into a number."""
+        whole = re.sub(r'[^0-9]', '', whole or '')
+        fraction = re.sub(r'[^0-9]', '', fraction or '')
+        if not whole:
+            return None
+
+        return float(f"{whole}.{fraction or '00'}")
+
+    @staticmethod
+    def extract_price(html: str) -> Optional[float]:
+        """Parse the price out of Amazon product HTML, or None if it is missing."""
+        tree = HTMLParser(html)
+
+        # Extract price components
+        price_whole = tree.css_first(AmazonScraper.SELECTORS['price'])
+        price_fraction = tree.css_first(AmazonScraper.SELECTORS['price_fraction'])
+
+        if not price_whole:
+            return None
+
+        return AmazonScraper.parse_price(price_whole.text(), price_fraction.text() if price_fraction else None)
+
     async def get_price(self, url: str) -> float:
+        """Extract price from Amazon product page.
+
+        Tries the server-rendered HTML first and only falls back to a full
+        Playwright render when the price selector is missing.
+        """
+        html = await self.fetcher.fetch(url, self.headers)
+        if html:
+            with stage('scrape.parse'):
+                price = self.extract_price(html)
+            if price is not None:
+                self.fetcher.record('amazon', 'http')
+                return price
+
+        try:
+            price = await self._get_price_browser(url)
+        except Exception:
+            self.fetcher.record('amazon', 'failed')
+            raise
+        self.fetcher.record('amazon', 'browser')
+        return price
+
+    async def _get_price_browser(self, url: str) -> float:
         """Extract price from Amazon product page using Playwright."""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
+        snapshot = await self.get_snapshot(url)
+        if snapshot['price'] is None:
+            raise Exception("Error scraping Amazon price: Price element not found")
+        return snapshot['price']
+
+    async def get_snapshot(self, url: str) -> dict:
+        """Price, title, rating, availability and image from a single page load."""
+        async with self.pool.page(self.headers, site='amazon') as page:
             try:
-                # Set user agent and navigate to URL
-                await page.set_extra_http_headers(self.headers)
-                await page.goto(url, wait_until='networkidle')
-                
-                # Wait for price element to be visible
-                await page.wait_for_selector('.a-price-whole', timeout=5000)
-                
-                # Get the page content
-                content = await page.content()
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Extract price components
-                price_whole = soup.select_one('.a-price-whole')
-                price_fraction = soup.select_one('.a-price-fraction')
-                
-                if not price_whole:
-                    raise ValueError('Price element not found')
-                
-                # Clean and combine price components
-                whole = re.sub(r'[^0-9]', '', price_whole.text)
-                fraction = re.sub(r'[^0-9]', '', price_fraction.text) if price_fraction else '00'
-                
-                # Convert to float
-                price = float(f"{whole}.{fraction}")
-                
-                return price
-            
+                raw = await take_snapshot(page, url, self.SELECTORS, self.WAIT_UNTIL, self.PRICE_TIMEOUT_MS)
             except Exception as e:
-                raise Exception(f"Error scraping Amazon price: {str(e)}")
-            
-            finally:
-                await browser.close()
+                raise Exception(f"Error scraping Amazon product: {str(e)}")
+
+        return {
+            'price': self.parse_price(raw['price'], raw['price_fraction']),
+            'title': raw['title'],
+            'rating': raw['rating'],
+            'availability': raw['availability'],
+            'image_url': raw['image_url']
+        }
 
     async def get_product_details(self, url: str) -> dict:
         """Extract additional product details from Amazon page."""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            try:
-                await page.set_extra_http_headers(self.headers)
-                await page.goto(url, wait_until='networkidle')
-                
-                content = await page.content()
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Extract product details
-                title = soup.select_one('#productTitle')
-                rating = soup.select_one('.a-icon-star-small')
-                availability = soup.select_one('#availability')
-                image = soup.select_one('#landingImage')
-                
-                return {
-                    'title': title.text.strip() if title else None,
-                    'rating': rating.text.strip() if rating else None,
-                    'availability': availability.text.strip() if availability else None,
-                    'image_url': image['src'] if image else None
-                }
-            
-            except Exception as e:
-                raise Exception(f"Error scraping Amazon product details: {str(e)}")
-            
-            finally:
-                await browser.close()
\ No newline at end of file
+        snapshot = await self.get_snapshot(url)
+        return {key: value for key, value in snapshot.items() if key != 'price'}
@@ -0,0 +1,184 @@
+"""Benchmark the lean page profile against full page loads on saved pages.
+
+Serves the pages in scraper/fixtures/ from a local HTTP server and scrapes
+each one with and without request blocking, reporting load time, requests
+and bytes. The fixtures are small hand-written stand-ins that keep the
+real pages' selectors and resource mix, not recordings; `?pad=<bytes>`
+serves one padded with filler markup to a real page's size. Fixture
+assets are generated on the fly (`/assets/<name>-<bytes>.<ext>`) and
+`{{THIRD_PARTY}}` in a page points at a second host name for the same
+server, so third-party blocking is exercised too. Run from the backend
+directory:
+
+    python -m scraper.bench_profile --runs 5
+"""
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+
+import numpy as np
+from playwright.async_api import async_playwright
+
+from scraper.amazon_scraper import AmazonScraper
+from scraper.flipkart_scraper import FlipkartScraper
+from scraper.page_profile import PageProfile
+from scraper.snapshot import take_snapshot
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+SCRAPERS = {'amazon': AmazonScraper, 'flipkart': FlipkartScraper}
+CONTENT_TYPES = {
+    'css': 'text/css', 'js': 'application/javascript', 'html': 'text/html', 'woff2': 'font/woff2',
+    'jpg': 'image/jpeg', 'gif': 'image/gif', 'mp4': 'video/mp4',
+}
+
+# Recommendation carousel cards; none of the scrapers' selectors match them
+_FILLER_CARD = (
+    '<li class="carousel-card"><a class="card-link" href="/dp/B{index:09d}">'
+    '<img alt="Related product {index}" src="/assets/related{index}-100.jpg" width="160" height="160">'
+    '<span class="card-title">Related product {index} with the long descriptive title stores use</span></a>'
+    '<span class="card-price">&#8377;{price:,}</span><span class="card-rating">4.{rating} stars</span></li>\n'
+)
+
+
+def pad_page(html: str, size: int) -> str:
+    """Grow a page to about `size` bytes with carousel markup and inline state before </body>."""
+    missing = size - len(html.encode())
+    if missing <= 0:
+        return html
+    cards, index = [], 0
+    # Roughly half markup, half the inline JSON state real pages embed
+    while sum(map(len, cards)) < missing // 2:
+        cards.append(_FILLER_CARD.format(index=index, price=999 + index * 37 % 20000, rating=index % 10))
+        index += 1
+    state = json.dumps({'related': [{'id': i, 'title': f'Related product {i}', 'price': 999 + i}
+                                    for i in range(max(1, (missing // 2) // 60))]})
+    filler = f'<ul class="carousel">{"".join(cards)}</ul><script type="application/json">{state}</script>'
+    return html.replace('</body>', filler + '</body>', 1)
+
+
+@lru_cache(maxsize=32)
+def _render(page: Path, third_party: str, pad: int) -> bytes:
+    # Cached so padding is not part of the measured fetch time
+    html = page.read_text().replace('{{THIRD_PARTY}}', third_party)
+    return (pad_page(html, pad) if pad else html).encode()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    third_party = ''
+    root = FIXTURES
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        asset = re.fullmatch(r'/assets/[\w]+-(\d+)\.(\w+)', parts.path)
+        if asset:
+            body = b'\0' * int(asset.group(1))
+            content_type = CONTENT_TYPES.get(asset.group(2), 'application/octet-stream')
+        else:
+            page = self.root / parts.path.lstrip('/')
+            if not page.is_file():
+                self.send_error(404)
+                return
+            pad = parse_qs(parts.query).get('pad')
+            body = _render(page, self.third_party, int(pad[0]) if pad else 0)
+            content_type = 'text/html; charset=utf-8'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(root: Path = FIXTURES) -> ThreadingHTTPServer:
+    """Serve the pages in `root` (the fixtures by default) on a free local port."""
+    FixtureHandler.root = root
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    # Pages are loaded from localhost; 127.0.0.1 plays the third party
+    FixtureHandler.third_party = f'http://127.0.0.1:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def scrape(browser, url: str, site: str, profile: PageProfile) -> Dict:
+    scraper = SCRAPERS[site]
+    context = await browser.new_context()
+    try:
+        resources = await profile.attach(context, site)
+        page = await context.new_page()
+        started = time.perf_counter()
+        raw = await take_snapshot(page, url, scraper.SELECTORS, scraper.WAIT_UNTIL, scraper.PRICE_TIMEOUT_MS)
+        elapsed = (time.perf_counter() - started) * 1000
+    finally:
+        await context.close()
+    return {'ms': elapsed, 'found_price': raw['price'] is not None, **resources}
+
+
+async def run(runs: int) -> Dict[str, Dict]:
+    server = serve_fixtures()
+    base = f'http://localhost:{server.server_port}'
+    profiles = {
+        # Counts everything, blocks nothing
+        'full': PageProfile(block_types=[], allow_domains=[], deny_domains=[], overrides={}),
+        'lean': PageProfile(overrides={site: {'allow_domains': ['localhost']} for site in SCRAPERS}),
+    }
+
+    results = {}
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            for fixture in sorted(FIXTURES.glob('*.html')):
+                site = fixture.name.split('_')[0]
+                if site not in SCRAPERS:
+                    continue
+                for name, profile in profiles.items():
+                    samples = [await scrape(browser, f'{base}/{fixture.name}', site, profile) for _ in range(runs)]
+                    results[f'{fixture.stem}/{name}'] = {
+                        'ms_p50': float(np.percentile([s['ms'] for s in samples], 50)),
+                        'requests': samples[-1]['allowed'],
+                        'blocked': samples[-1]['blocked'],
+                        'bytes': samples[-1]['bytes'],
+                        'found_price': all(s['found_price'] for s in samples),
+                    }
+        finally:
+            await browser.close()
+            server.shutdown()
+
+    for key, result in results.items():
+        if key.endswith('/lean'):
+            full = results[key[:-len('lean')] + 'full']
+            result['requests_saved'] = full['requests'] - result['requests']
+            result['bytes_saved'] = full['bytes'] - result['bytes']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='scrapes per page and profile')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.runs))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'page/profile':<28} {'p50 ms':>8} {'requests':>9} {'blocked':>8} {'KB':>8} {'KB saved':>9} {'price':>6}")
+    for key, r in results.items():
+        saved: Optional[int] = r.get('bytes_saved')
+        print(f"{key:<28} {r['ms_p50']:>8.1f} {r['requests']:>9} {r['blocked']:>8} {r['bytes'] / 1024:>8.0f} "
+              f"{'' if saved is None else f'{saved / 1024:.0f}':>9} {str(r['found_price']):>6}")
+
+
+if __name__ == "__main__":
+    main()
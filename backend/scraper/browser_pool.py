@@ -0,0 +1,154 @@
+from playwright.async_api import async_playwright, Browser, Page, Error as PlaywrightError
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+import asyncio
+import os
+
+from monitoring.metrics import stage
+from scraper.page_profile import PageProfile, shared_profile
+
+
+class _BrowserSlot:
+    """A launched browser plus the bookkeeping needed to recycle it."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active_pages = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """Process-wide pool of headless Chromium browsers shared by the scrapers.
+
+    Each scrape gets its own isolated browser context, concurrency is capped
+    by a semaphore, and browsers are recycled after serving a fixed number of
+    pages or when they crash. Contexts load pages through a PageProfile that
+    blocks resources a scrape does not need.
+    """
+
+    def __init__(self, max_pages: Optional[int] = None, recycle_after: Optional[int] = None,
+                 headless: bool = True, profile: Optional[PageProfile] = None):
+        self.max_pages = max_pages or int(os.getenv('BROWSER_MAX_PAGES', '4'))
+        self.recycle_after = recycle_after or int(os.getenv('BROWSER_RECYCLE_AFTER', '200'))
+        self.headless = headless
+        if profile is None and os.getenv('SCRAPER_PAGE_PROFILE', '1') == '1':
+            profile = shared_profile
+        self.profile = profile
+
+        self._playwright = None
+        self._slot: Optional[_BrowserSlot] = None
+        self._semaphore = asyncio.Semaphore(self.max_pages)
+        self._lock = asyncio.Lock()
+        self._stats = {'launched': 0, 'recycled': 0, 'crashed': 0, 'pages': 0}
+
+    async def start(self) -> None:
+        """Start Playwright. Browsers are launched lazily on first use."""
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+    async def prewarm(self) -> None:
+        """Launch the browser now instead of on the first scrape."""
+        slot = await self._acquire_slot()
+        self._stats['pages'] -= 1
+        await self._release_slot(slot)
+
+    async def stop(self) -> None:
+        """Close the current browser and shut Playwright down."""
+        async with self._lock:
+            if self._slot is not None:
+                await self._close_browser(self._slot.browser)
+                self._slot = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    @asynccontextmanager
+    async def page(self, extra_http_headers: Optional[Dict[str, str]] = None,
+                   site: Optional[str] = None) -> AsyncIterator[Page]:
+        """Yield a fresh page in its own browser context.
+
+        `site` selects the page profile's per-site overrides.
+        """
+        async with self._semaphore:
+            slot = await self._acquire_slot()
+            context = None
+            resources = None
+            try:
+                with stage('browser.new_page'):
+                    context = await slot.browser.new_context(extra_http_headers=extra_http_headers)
+                    if self.profile is not None:
+                        resources = await self.profile.attach(context, site)
+                    page = await context.new_page()
+                yield page
+            except Exception:
+                if not slot.retired and not slot.browser.is_connected():
+                    self._stats['crashed'] += 1
+                    slot.retired = True
+                raise
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except PlaywrightError:
+                        pass
+                if resources is not None:
+                    self.profile.record(resources)
+                await self._release_slot(slot)
+
+    def stats(self) -> Dict:
+        """Return pool counters."""
+        return {
+            **self._stats,
+            'max_pages': self.max_pages,
+            'active_pages': self._slot.active_pages if self._slot else 0,
+            'resources': self.profile.stats() if self.profile is not None else None,
+        }
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            slot = self._slot
+            if slot is not None and not slot.retired:
+                if not slot.browser.is_connected():
+                    self._stats['crashed'] += 1
+                    slot.retired = True
+                elif slot.pages_served >= self.recycle_after:
+                    self._stats['recycled'] += 1
+                    slot.retired = True
+
+            if slot is None or slot.retired:
+                if slot is not None and slot.active_pages == 0:
+                    await self._close_browser(slot.browser)
+                with stage('browser.launch'):
+                    browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._stats['launched'] += 1
+                slot = self._slot = _BrowserSlot(browser)
+
+            slot.pages_served += 1
+            slot.active_pages += 1
+            self._stats['pages'] += 1
+            return slot
+
+    async def _release_slot(self, slot: _BrowserSlot) -> None:
+        async with self._lock:
+            slot.active_pages -= 1
+            # A retired browser is closed once its last page is done
+            if slot.retired and slot.active_pages == 0:
+                await self._close_browser(slot.browser)
+                if self._slot is slot:
+                    self._slot = None
+
+    @staticmethod
+    async def _close_browser(browser: Browser) -> None:
+        try:
+            await browser.close()
+        except PlaywrightError:
+            pass
+
+
+# Shared by every scraper instance in the process; main.py owns its lifecycle
+shared_pool = BrowserPool()
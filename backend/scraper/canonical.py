@@ -0,0 +1,76 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+import re
+
+# Hosts prefixes that reach the same store: desktop, mobile and app links
+_HOST_PREFIXES = ('www.', 'm.', 'dl.', 'smile.')
+
+_ASIN_PATH = re.compile(
+    r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([a-z0-9]{10})(?:[/?]|$)',
+    re.IGNORECASE
+)
+_FLIPKART_PATH = re.compile(r'^(?:/dl)?(/[^?#]*?/p/(itm[a-z0-9]+))', re.IGNORECASE)
+
+
+def _store_domain(host: str) -> str:
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+
+def _amazon(domain: str, path: str, query: str) -> Optional[Tuple[str, str]]:
+    match = _ASIN_PATH.search(path + '/')
+    if not match:
+        return None
+    asin = match.group(1).upper()
+    return f"{domain}/{asin}", f"https://www.{domain}/dp/{asin}"
+
+
+def _flipkart(domain: str, path: str, query: str) -> Optional[Tuple[str, str]]:
+    match = _FLIPKART_PATH.match(path)
+    if not match:
+        return None
+    path, item = match.group(1), match.group(2).lower()
+    pid = (parse_qs(query).get('pid') or [''])[0].upper()
+    # pid identifies the exact variant; the item id is the fallback
+    if pid:
+        return f"{domain}/{pid}", f"https://www.{domain}{path}?pid={pid}"
+    return f"{domain}/{item}", f"https://www.{domain}{path}"
+
+
+# Canonicalizers by site, matched against the store's domain
+CANONICALIZERS = {
+    'amazon': _amazon,
+    'flipkart': _flipkart,
+}
+
+
+@lru_cache(maxsize=4096)
+def canonicalize(url: str) -> Tuple[str, str]:
+    """Return the stable product key and canonical URL for a product URL.
+
+    Amazon products are identified by ASIN and Flipkart products by `pid`
+    (or item id), per store domain, so referral, tracking and mobile
+    variants of a URL share one key. Unrecognised URLs are their own key,
+    minus the fragment.
+    """
+    parts = urlsplit(url.strip())
+    domain = _store_domain((parts.hostname or '').lower())
+    for site, canonicalizer in CANONICALIZERS.items():
+        if site in domain:
+            identity = canonicalizer(domain, parts.path, parts.query)
+            if identity is not None:
+                return identity
+
+    fallback = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ''))
+    return fallback, fallback
+
+
+def product_key(url: str) -> str:
+    return canonicalize(url)[0]
+
+
+def canonical_url(url: str) -> str:
+    return canonicalize(url)[1]
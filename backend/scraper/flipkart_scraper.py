@@ -1,78 +1,97 @@
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 import re
 from typing import Optional
 
+from scraper.browser_pool import BrowserPool, shared_pool
+from scraper.http_fetcher import HttpFetcher, shared_fetcher
+from monitoring.metrics import stage
+from scraper.snapshot import take_snapshot
+
 class FlipkartScraper:
-    def __init__(self):
+    SELECTORS = {
+        'price': '._30jeq3._16Jk6d',
+        'title': 'span.B_NuCI',
+        'rating': 'div._3LWZlK',
+        'availability': 'div._16FRp0',
+        'image_url': 'img._396cs4'
+    }
+    # The price block is hydrated by script after DOMContentLoaded, so the
+    # price selector wait does the real work and gets a longer budget
+    WAIT_UNTIL = 'domcontentloaded'
+    PRICE_TIMEOUT_MS = 8000
+
+    def __init__(self, pool: Optional[BrowserPool] = None, fetcher: Optional[HttpFetcher] = None):
+        self.pool = pool or shared_pool
+        self.fetcher = fetcher or shared_fetcher
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
+    @staticmethod
+    def parse_price(text: Optional[str]) -> Optional[float]:
+        """Clean price string (remove currency symbol and commas)."""
+        price_text = re.sub(r'[^0-9.]', '', (text or '').strip())
+        if not price_text:
+            return None
+
+        return float(price_text)
+
+    @staticmethod
+    def extract_price(html: str) -> Optional[float]:
+        """Parse the price out of Flipkart product HTML, or None if it is missing."""
+        price_element = HTMLParser(html).css_first(FlipkartScraper.SELECTORS['price'])
+
+        if not price_element:
+            return None
+
+        return FlipkartScraper.parse_price(price_element.text())
+
     async def get_price(self, url: str) -> float:
+        """Extract price from Flipkart product page.
+
+        Tries the server-rendered HTML first and only falls back to a full
+        Playwright render when the price selector is missing.
+        """
+        html = await self.fetcher.fetch(url, self.headers)
+        if html:
+            with stage('scrape.parse'):
+                price = self.extract_price(html)
+            if price is not None:
+                self.fetcher.record('flipkart', 'http')
+                return price
+
+        try:
+            price = await self._get_price_browser(url)
+        except Exception:
+            self.fetcher.record('flipkart', 'failed')
+            raise
+        self.fetcher.record('flipkart', 'browser')
+        return price
+
+    async def _get_price_browser(self, url: str) -> float:
         """Extract price from Flipkart product page using Playwright."""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
+        snapshot = await self.get_snapshot(url)
+        if snapshot['price'] is None:
+            raise Exception("Error scraping Flipkart price: Price element not found")
+        return snapshot['price']
+
+    async def get_snapshot(self, url: str) -> dict:
+        """Price, title, rating, availability and image from a single page load."""
+        async with self.pool.page(self.headers, site='flipkart') as page:
             try:
-                # Set user agent and navigate to URL
-                await page.set_extra_http_headers(self.headers)
-                await page.goto(url, wait_until='networkidle')
-                
-                # Wait for price element to be visible
-                await page.wait_for_selector('._30jeq3._16Jk6d', timeout=5000)
-                
-                # Get the page content
-                content = await page.content()
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Extract price
-                price_element = soup.select_one('._30jeq3._16Jk6d')
-                
-                if not price_element:
-                    raise ValueError('Price element not found')
-                
-                # Clean price string (remove currency symbol and commas)
-                price_text = price_element.text.strip()
-                price = float(re.sub(r'[^0-9.]', '', price_text))
-                
-                return price
-            
+                raw = await take_snapshot(page, url, self.SELECTORS, self.WAIT_UNTIL, self.PRICE_TIMEOUT_MS)
             except Exception as e:
-                raise Exception(f"Error scraping Flipkart price: {str(e)}")
-            
-            finally:
-                await browser.close()
+                raise Exception(f"Error scraping Flipkart product: {str(e)}")
+
+        return {
+            'price': self.parse_price(raw['price']),
+            'title': raw['title'],
+            'rating': raw['rating'],
+            'availability': raw['availability'],
+            'image_url': raw['image_url']
+        }
 
     async def get_product_details(self, url: str) -> dict:
         """Extract additional product details from Flipkart page."""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            try:
-                await page.set_extra_http_headers(self.headers)
-                await page.goto(url, wait_until='networkidle')
-                
-                content = await page.content()
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Extract product details
-                title = soup.select_one('span.B_NuCI')
-                rating = soup.select_one('div._3LWZlK')
-                availability = soup.select_one('div._16FRp0')
-                image = soup.select_one('img._396cs4')
-                
-                return {
-                    'title': title.text.strip() if title else None,
-                    'rating': rating.text.strip() if rating else None,
-                    'availability': availability.text.strip() if availability else None,
-                    'image_url': image['src'] if image else None
-                }
-            
-            except Exception as e:
-                raise Exception(f"Error scraping Flipkart product details: {str(e)}")
-            
-            finally:
-                await browser.close()
\ No newline at end of file
+        snapshot = await self.get_snapshot(url)
+        return {key: value for key, value in snapshot.items() if key != 'price'}
@@ -0,0 +1,62 @@
+import httpx
+from collections import defaultdict
+from typing import Dict, Optional
+import os
+
+from monitoring.metrics import SCRAPES, stage
+
+
+class HttpFetcher:
+    """Pooled async HTTP client for the browserless fast path.
+
+    Also keeps per-site counters of which tier (plain HTTP or Playwright)
+    ended up serving each scrape.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, max_connections: Optional[int] = None):
+        self.timeout = timeout or float(os.getenv('HTTP_FETCH_TIMEOUT', '10'))
+        self.max_connections = max_connections or int(os.getenv('HTTP_MAX_CONNECTIONS', '20'))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats = defaultdict(lambda: {'http': 0, 'browser': 0, 'failed': 0})
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Return the page HTML, or None if the site did not serve it."""
+        try:
+            with stage('scrape.http_fetch'):
+                response = await self._get_client().get(url, headers=headers)
+        except httpx.HTTPError:
+            return None
+
+        if response.status_code != 200:
+            return None
+        return response.text
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def record(self, site: str, tier: str) -> None:
+        """Count a scrape as served by `tier` ('http', 'browser' or 'failed')."""
+        self._stats[site][tier] += 1
+        SCRAPES.inc(site=site, tier=tier)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return per-site tier counters."""
+        return {site: dict(counts) for site, counts in self._stats.items()}
+
+
+# Shared by every scraper instance in the process; main.py owns its lifecycle
+shared_fetcher = HttpFetcher()
@@ -0,0 +1,140 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+import os
+
+from monitoring.metrics import BROWSER_BYTES, BROWSER_REQUESTS
+
+# Ad, analytics and tag-manager hosts seen on product pages; never needed for a price
+DEFAULT_DENY_DOMAINS = [
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'google-analytics.com',
+    'googletagmanager.com', 'facebook.net', 'facebook.com', 'amazon-adsystem.com',
+    'scorecardresearch.com', 'criteo.com', 'criteo.net', 'hotjar.com', 'newrelic.com', 'nr-data.net',
+]
+
+# Per-site rules layered over the defaults. First-party and CDN hosts are
+# allowed; any other third party is blocked.
+SITE_OVERRIDES = {
+    'amazon': {
+        'allow_domains': ['amazon.in', 'amazon.com', 'media-amazon.com', 'ssl-images-amazon.com'],
+    },
+    'flipkart': {
+        'allow_domains': ['flipkart.com', 'flixcart.com', 'flipkart.net'],
+    },
+}
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class PageProfile:
+    """Request-interception rules applied to every scraping browser context.
+
+    Requests are blocked by resource type (images, media and fonts by
+    default), by a deny list of ad/tracking domains and, when a site has an
+    allow list, by being third-party. Counters per scrape and in total show
+    what was blocked and how many bytes were still loaded; recorded scrapes
+    are also counted per site in /metrics.
+    """
+
+    def __init__(self, block_types: Optional[Iterable[str]] = None,
+                 allow_domains: Optional[Iterable[str]] = None,
+                 deny_domains: Optional[Iterable[str]] = None,
+                 overrides: Optional[Dict[str, Dict]] = None):
+        self.block_types = set(block_types if block_types is not None
+                               else _split(os.getenv('SCRAPER_BLOCK_TYPES', 'image,media,font')))
+        self.allow_domains = list(allow_domains if allow_domains is not None
+                                  else _split(os.getenv('SCRAPER_ALLOW_DOMAINS')))
+        self.deny_domains = list(deny_domains if deny_domains is not None
+                                 else DEFAULT_DENY_DOMAINS + _split(os.getenv('SCRAPER_DENY_DOMAINS')))
+        self.overrides = SITE_OVERRIDES if overrides is None else overrides
+        self._totals = {'scrapes': 0, 'allowed': 0, 'blocked': 0, 'bytes': 0}
+        self._sites: Dict[str, Dict] = defaultdict(lambda: {'scrapes': 0, 'allowed': 0, 'blocked': 0, 'bytes': 0,
+                                                              'blocked_by': defaultdict(int)})
+
+    def rules_for(self, site: Optional[str] = None) -> Dict:
+        """Effective rules for a site: the defaults with its override applied."""
+        rules = {
+            'block_types': set(self.block_types),
+            'allow_domains': list(self.allow_domains),
+            'deny_domains': list(self.deny_domains),
+        }
+        for key, value in self.overrides.get(site, {}).items():
+            rules[key] = set(value) if key == 'block_types' else list(value)
+        return rules
+
+    @staticmethod
+    def should_block(url: str, resource_type: str, rules: Dict) -> Optional[str]:
+        """Return why a request is blocked ('denied', 'type' or 'third-party'), or None."""
+        host = (urlparse(url).hostname or '').lower()
+        if _host_matches(host, rules['deny_domains']):
+            return 'denied'
+        if resource_type in rules['block_types']:
+            return 'type'
+        # Navigations are never third-party blocked so redirects keep working
+        if rules['allow_domains'] and resource_type != 'document' and not _host_matches(host, rules['allow_domains']):
+            return 'third-party'
+        return None
+
+    async def attach(self, context, site: Optional[str] = None) -> Dict:
+        """Route all of a browser context's requests through the rules.
+
+        Returns the live counters for this scrape; pass them to record()
+        once the scrape is done.
+        """
+        rules = self.rules_for(site)
+        stats = {'site': site, 'allowed': 0, 'blocked': 0, 'bytes': 0, 'blocked_by': {}}
+
+        async def handle(route):
+            request = route.request
+            reason = self.should_block(request.url, request.resource_type, rules)
+            if reason is None:
+                stats['allowed'] += 1
+                await route.continue_()
+            else:
+                stats['blocked'] += 1
+                stats['blocked_by'][reason] = stats['blocked_by'].get(reason, 0) + 1
+                await route.abort('blockedbyclient')
+
+        def on_response(response):
+            length = response.headers.get('content-length', '')
+            if length.isdigit():
+                stats['bytes'] += int(length)
+
+        await context.route('**/*', handle)
+        context.on('response', on_response)
+        return stats
+
+    def record(self, stats: Dict) -> None:
+        """Add one scrape's counters from attach() to the totals and the metrics."""
+        site = stats.get('site') or 'other'
+        totals = self._sites[site]
+        self._totals['scrapes'] += 1
+        totals['scrapes'] += 1
+        for key in ('allowed', 'blocked', 'bytes'):
+            self._totals[key] += stats[key]
+            totals[key] += stats[key]
+        for reason, count in stats['blocked_by'].items():
+            totals['blocked_by'][reason] += count
+            BROWSER_REQUESTS.inc(count, site=site, outcome=reason)
+        if stats['allowed']:
+            BROWSER_REQUESTS.inc(stats['allowed'], site=site, outcome='allowed')
+        if stats['bytes']:
+            BROWSER_BYTES.inc(stats['bytes'], site=site)
+
+    def stats(self) -> Dict:
+        """Totals over recorded scrapes, with a per-site breakdown of why requests were blocked."""
+        return {
+            **self._totals,
+            'sites': {site: {**totals, 'blocked_by': dict(totals['blocked_by'])}
+                      for site, totals in self._sites.items()},
+        }
+
+
+# Used by the shared browser pool unless SCRAPER_PAGE_PROFILE=0
+shared_profile = PageProfile()
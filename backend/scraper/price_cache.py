@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import os
+import time
+
+
+class PriceCache:
+    """Bounded TTL/LRU cache of recent prices with single-flight scraping.
+
+    Concurrent requests for the same URL share one in-flight scrape instead
+    of each launching their own.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv('PRICE_CACHE_TTL_SECONDS', '300'))
+        self.max_size = max_size or int(os.getenv('PRICE_CACHE_SIZE', '1000'))
+        self._entries: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    def get(self, url: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Return a cached price no older than `max_age` seconds (default: the TTL)."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+
+        price, fetched_at = entry
+        if time.monotonic() - fetched_at > (self.ttl if max_age is None else max_age):
+            return None
+
+        self._entries.move_to_end(url)
+        return price
+
+    def put(self, url: str, price: float) -> None:
+        self._entries[url] = (price, time.monotonic())
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, url: str) -> None:
+        self._entries.pop(url, None)
+
+    async def get_or_fetch(self, url: str, fetch: Callable[[], Awaitable[float]],
+                           max_age: Optional[float] = None) -> float:
+        """Return a fresh cached price, or join/start the scrape for `url`."""
+        price = self.get(url, max_age)
+        if price is not None:
+            self._stats['hits'] += 1
+            return price
+
+        task = self._inflight.get(url)
+        if task is None:
+            self._stats['misses'] += 1
+            task = asyncio.ensure_future(self._fetch(url, fetch))
+            task.add_done_callback(_consume_exception)
+            self._inflight[url] = task
+        else:
+            self._stats['coalesced'] += 1
+
+        # Shield so one cancelled caller does not cancel the scrape for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'size': len(self._entries), 'inflight': len(self._inflight)}
+
+    async def _fetch(self, url: str, fetch: Callable[[], Awaitable[float]]) -> float:
+        try:
+            price = await fetch()
+            self.put(url, price)
+            return price
+        finally:
+            self._inflight.pop(url, None)
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # The error is re-raised to every waiter; this only silences the
+    # "exception was never retrieved" warning when all of them went away
+    if not task.cancelled():
+        task.exception()
+
+
+# Shared by the API and the refresh scheduler
+shared_cache = PriceCache()
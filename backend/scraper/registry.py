@@ -0,0 +1,38 @@
+from typing import Dict, Optional, Tuple, Union
+
+from scraper.amazon_scraper import AmazonScraper
+from scraper.canonical import canonical_url
+from scraper.flipkart_scraper import FlipkartScraper
+
+# Scraper classes by site, matched against the product URL
+SCRAPERS = {
+    'amazon': AmazonScraper,
+    'flipkart': FlipkartScraper,
+}
+
+_instances: Dict[str, Union[AmazonScraper, FlipkartScraper]] = {}
+
+
+def site_for(url: str) -> Optional[str]:
+    """Return the site a product URL belongs to, or None if unsupported."""
+    for site in SCRAPERS:
+        if site in url:
+            return site
+    return None
+
+
+def get_scraper(url: str) -> Union[AmazonScraper, FlipkartScraper]:
+    """Return the shared scraper instance for a product URL."""
+    site = site_for(url)
+    if site is None:
+        raise ValueError("Unsupported website")
+
+    if site not in _instances:
+        _instances[site] = SCRAPERS[site]()
+    return _instances[site]
+
+
+def resolve(url: str) -> Tuple[Union[AmazonScraper, FlipkartScraper], str]:
+    """Return the scraper for a product URL and the canonical URL to scrape and key it by."""
+    url = canonical_url(url)
+    return get_scraper(url), url
@@ -0,0 +1,43 @@
+from typing import Dict, Optional
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from monitoring.metrics import stage
+
+# Runs in the page: reads every field in one evaluation instead of
+# serializing the whole DOM back with page.content()
+SNAPSHOT_SCRIPT = """
+(selectors) => {
+    const result = {};
+    for (const [field, selector] of Object.entries(selectors)) {
+        const element = selector ? document.querySelector(selector) : null;
+        if (!element) {
+            result[field] = null;
+        } else if (field === 'image_url') {
+            result[field] = element.getAttribute('src');
+        } else {
+            result[field] = element.textContent.trim();
+        }
+    }
+    return result;
+}
+"""
+
+
+async def take_snapshot(page, url: str, selectors: Dict[str, str], wait_until: str,
+                        price_timeout_ms: float) -> Dict[str, Optional[str]]:
+    """Load `url` once and return the raw text of every selector.
+
+    Waits for `wait_until` and then only as long as the price selector needs
+    to appear; a missing price (e.g. out of stock) still returns the other
+    fields.
+    """
+    with stage('scrape.goto'):
+        await page.goto(url, wait_until=wait_until)
+    try:
+        with stage('scrape.wait_price'):
+            await page.wait_for_selector(selectors['price'], timeout=price_timeout_ms)
+    except PlaywrightTimeoutError:
+        pass
+    with stage('scrape.evaluate'):
+        return await page.evaluate(SNAPSHOT_SCRIPT, selectors)
@@ -0,0 +1,21 @@
+from scraper.canonical import canonicalize, product_key
+
+def test_amazon_variants_share_one_key():
+    variants = [
+        'https://www.amazon.in/Sony-WH-1000XM5/dp/B09XS7JWHH/ref=sr_1_3?keywords=sony&tag=abc-21',
+        'https://amazon.in/dp/b09xs7jwhh?th=1',
+        'https://m.amazon.in/gp/aw/d/B09XS7JWHH',
+        'https://www.amazon.in/gp/product/B09XS7JWHH?psc=1',
+    ]
+    assert {canonicalize(url) for url in variants} == {('amazon.in/B09XS7JWHH', 'https://www.amazon.in/dp/B09XS7JWHH')}
+    # Another marketplace is another product
+    assert product_key('https://www.amazon.com/dp/B09XS7JWHH') == 'amazon.com/B09XS7JWHH'
+
+def test_flipkart_keyed_by_pid():
+    key, url = canonicalize('https://dl.flipkart.com/dl/apple-iphone-15/p/itm6ac6485515ae4?pid=MOBGTAGPAQNVFZZY&lid=LST&marketplace=FLIPKART')
+    assert key == 'flipkart.com/MOBGTAGPAQNVFZZY'
+    assert url == 'https://www.flipkart.com/apple-iphone-15/p/itm6ac6485515ae4?pid=MOBGTAGPAQNVFZZY'
+    assert product_key('https://www.flipkart.com/apple-iphone-15/p/itm6ac6485515ae4') == 'flipkart.com/itm6ac6485515ae4'
+
+def test_unrecognised_url_is_its_own_key():
+    assert canonicalize('https://Example.com/item?id=1#reviews') == ('https://example.com/item?id=1',) * 2
@@ -0,0 +1,34 @@
+from monitoring.metrics import BROWSER_BYTES, BROWSER_REQUESTS
+from scraper.page_profile import PageProfile
+
+def profile():
+    return PageProfile(block_types=['image', 'font'], allow_domains=[], deny_domains=['doubleclick.net'],
+                       overrides={'amazon': {'allow_domains': ['amazon.in', 'media-amazon.com']}})
+
+def test_blocks_types_and_denied_domains():
+    rules = profile().rules_for(None)
+    assert PageProfile.should_block('https://m.media-amazon.com/a.jpg', 'image', rules) == 'type'
+    assert PageProfile.should_block('https://ad.doubleclick.net/x.js', 'script', rules) == 'denied'
+    assert PageProfile.should_block('https://example.com/app.js', 'script', rules) is None
+
+def test_site_allow_list_blocks_third_parties():
+    rules = profile().rules_for('amazon')
+    assert PageProfile.should_block('https://www.amazon.in/dp/B000', 'document', rules) is None
+    assert PageProfile.should_block('https://m.media-amazon.com/app.js', 'script', rules) is None
+    assert PageProfile.should_block('https://cdn.example.com/app.js', 'script', rules) == 'third-party'
+    # Navigations are left alone so redirects keep working
+    assert PageProfile.should_block('https://example.com/', 'document', rules) is None
+
+def test_recorded_scrapes_are_counted_per_site():
+    lean = profile()
+    for blocked_by in ({'type': 3, 'third-party': 1}, {'type': 2}):
+        lean.record({'site': 'test-site', 'allowed': 5, 'blocked': sum(blocked_by.values()), 'bytes': 1000,
+                     'blocked_by': blocked_by})
+
+    stats = lean.stats()
+    assert (stats['scrapes'], stats['allowed'], stats['blocked'], stats['bytes']) == (2, 10, 6, 2000)
+    assert stats['sites']['test-site']['blocked_by'] == {'type': 5, 'third-party': 1}
+    samples = list(BROWSER_REQUESTS.samples()) + list(BROWSER_BYTES.samples())
+    assert 'price_tracker_browser_requests_total{site="test-site",outcome="type"} 5' in samples
+    assert 'price_tracker_browser_requests_total{site="test-site",outcome="allowed"} 10' in samples
+    assert 'price_tracker_browser_bytes_total{site="test-site"} 2000' in samples
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from scraper.amazon_scraper import AmazonScraper
+from scraper.flipkart_scraper import FlipkartScraper
+
+AMAZON_HTML = """
+<html><body>
+  <span id="productTitle"> Test Product </span>
+  <span class="a-price"><span class="a-price-whole">1,299.</span><span class="a-price-fraction">50</span></span>
+</body></html>
+"""
+
+FLIPKART_HTML = """
+<html><body>
+  <span class="B_NuCI">Test Product</span>
+  <div class="_30jeq3 _16Jk6d">&#8377;2,499</div>
+</body></html>
+"""
+
+def test_amazon_extract_price():
+    assert AmazonScraper.extract_price(AMAZON_HTML) == pytest.approx(1299.50)
+
+def test_amazon_extract_price_missing():
+    assert AmazonScraper.extract_price('<html><body></body></html>') is None
+
+def test_flipkart_extract_price():
+    assert FlipkartScraper.extract_price(FLIPKART_HTML) == pytest.approx(2499)
+
+def test_flipkart_extract_price_missing():
+    assert FlipkartScraper.extract_price('<html><body></body></html>') is None
+
+class FakePage:
+    def __init__(self, fields):
+        self.fields = fields
+        self.visits = []
+
+    async def goto(self, url, wait_until):
+        self.visits.append((url, wait_until))
+
+    async def wait_for_selector(self, selector, timeout):
+        pass
+
+    async def evaluate(self, script, selectors):
+        return {field: self.fields.get(field) for field in selectors}
+
+class FakePool:
+    def __init__(self, page):
+        self._page = page
+
+    def page(self, headers=None, site=None):
+        pool = self
+        class Context:
+            async def __aenter__(self):
+                return pool._page
+            async def __aexit__(self, *exc):
+                return False
+        return Context()
+
+def test_snapshot_is_a_single_visit():
+    page = FakePage({'price': '1,299.', 'price_fraction': '50', 'title': 'Test Product', 'image_url': '/a.jpg'})
+    snapshot = asyncio.run(AmazonScraper(pool=FakePool(page)).get_snapshot('https://www.amazon.in/dp/B000'))
+    assert snapshot['price'] == pytest.approx(1299.50)
+    assert snapshot['title'] == 'Test Product'
+    assert snapshot['image_url'] == '/a.jpg'
+    assert snapshot['rating'] is None
+    assert page.visits == [('https://www.amazon.in/dp/B000', AmazonScraper.WAIT_UNTIL)]
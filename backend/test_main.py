@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+import asyncio
+import os
+import pytest
+import mongomock_motor
+
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:1')
+
+from fastapi.testclient import TestClient
+from database.db import Database
+from scraper.canonical import canonicalize
+import main
+
+KEY, URL = canonicalize('https://www.amazon.in/dp/B000000001')
+RUNS = [(datetime(2024, 1, 1), 100.0), (datetime(2024, 1, 2), 90.0), (datetime(2024, 1, 3), 80.0)]
+
+@pytest.fixture
+def client(monkeypatch):
+    db = Database(client=mongomock_motor.AsyncMongoMockClient())
+    asyncio.run(db.price_history.insert_many([
+        {'key': KEY, 'url': URL, 'price': price, 'timestamp': when, 'last_seen': when + timedelta(hours=20)}
+        for when, price in RUNS
+    ]))
+    monkeypatch.setattr(main, 'db', db)
+    # Not used as a context manager, so the lifespan (MongoDB, Chromium, scheduler) never starts
+    return TestClient(main.app)
+
+def test_history_accepts_utc_offsets(client):
+    response = client.get('/api/history', params={
+        'url': URL, 'from': '2024-01-01T12:00:00Z', 'to': '2024-01-02T17:30:00+05:30', 'points': 3
+    })
+    assert response.status_code == 200
+    assert response.json() == [
+        {'date': '2024-01-01T12:00:00', 'price': 100.0},
+        {'date': '2024-01-02T00:00:00', 'price': 90.0},
+        {'date': '2024-01-02T12:00:00', 'price': 90.0},
+    ]
@@ -0,0 +1,57 @@
+"""Standalone scrape worker that shares the tracked products with other workers.
+
+Due products are claimed from MongoDB through expiring leases, so any
+number of workers on any number of machines can run against the same
+database without scraping a product twice. Stop with Ctrl-C or SIGTERM;
+products in hand are finished and released first. Run from the backend
+directory:
+
+    python -m worker --concurrency 16
+"""
+from datetime import timedelta
+import argparse
+import asyncio
+import signal
+
+from database.db import Database
+from database.migrate_keys import migrate_if_needed
+from scraper.browser_pool import shared_pool
+from scraper.http_fetcher import shared_fetcher
+from worker.scrape_worker import ScrapeWorker
+
+
+async def run(args) -> None:
+    db = Database()
+    await db.connect()
+    await migrate_if_needed(db)
+    await db.ensure_indexes()
+
+    worker = ScrapeWorker(
+        db,
+        concurrency=args.concurrency,
+        lease=timedelta(seconds=args.lease_seconds) if args.lease_seconds else None
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    await shared_pool.start()
+    print(f"✅ Worker {worker.owner} started ({worker.concurrency} concurrent scrapes)")
+    try:
+        stats = await (worker.run_once() if args.once else worker.run())
+    finally:
+        await shared_fetcher.close()
+        await shared_pool.stop()
+    print(f"Worker {worker.owner} stopped: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, help='products scraped at once (default: WORKER_CONCURRENCY)')
+    parser.add_argument('--lease-seconds', type=int, help='lease length (default: WORKER_LEASE_SECONDS)')
+    parser.add_argument('--once', action='store_true', help='exit when no products are due')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+from datetime import timedelta
+from typing import Dict, Optional
+import asyncio
+import os
+import socket
+import uuid
+
+from database.db import Database
+from scraper.registry import resolve, site_for
+
+
+class ScrapeWorker:
+    """Scrapes due products claimed from MongoDB through expiring leases.
+
+    Each of `concurrency` loops claims one product at a time with
+    Database.claim_product, scrapes it with the registry's scrapers and
+    records the price with Database.update_price, then releases the lease.
+    Held leases are renewed every third of the lease period, so only a
+    worker that died (or hung) loses its products to other workers. Any
+    number of workers can share one database; run the API with
+    REFRESH_ENABLED=0 so its scheduler does not scrape the same products.
+    """
+
+    def __init__(self, db: Database, owner: Optional[str] = None, concurrency: Optional[int] = None,
+                 per_domain: Optional[int] = None, lease: Optional[timedelta] = None,
+                 interval: Optional[timedelta] = None, retry_after: Optional[timedelta] = None,
+                 poll_seconds: Optional[float] = None):
+        self.db = db
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency or int(os.getenv('WORKER_CONCURRENCY', '8'))
+        self.per_domain = per_domain or int(os.getenv('WORKER_PER_DOMAIN', '4'))
+        self.lease = lease or timedelta(seconds=int(os.getenv('WORKER_LEASE_SECONDS', '300')))
+        self.interval = interval or timedelta(minutes=int(os.getenv('REFRESH_INTERVAL_MINUTES', '60')))
+        self.retry_after = retry_after or timedelta(minutes=int(os.getenv('WORKER_RETRY_MINUTES', '15')))
+        self.poll_seconds = poll_seconds or float(os.getenv('WORKER_POLL_SECONDS', '10'))
+
+        # Keys of the products this worker currently holds a lease on
+        self._held: Dict[str, str] = {}
+        self._domains: Dict[str, asyncio.Semaphore] = {}
+        self._stopping = asyncio.Event()
+        self._stats = {'claimed': 0, 'scraped': 0, 'failed': 0, 'skipped': 0, 'lost': 0}
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'held': len(self._held)}
+
+    def stop(self) -> None:
+        """Finish the products in hand, release them and return from run()."""
+        self._stopping.set()
+
+    async def run(self) -> Dict[str, int]:
+        """Claim and scrape products until stop() is called."""
+        return await self._run(once=False)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Claim and scrape products until none are due, then return the counters."""
+        return await self._run(once=True)
+
+    async def _run(self, once: bool) -> Dict[str, int]:
+        renewer = asyncio.create_task(self._renew())
+        try:
+            await asyncio.gather(*(self._work(once) for _ in range(self.concurrency)))
+        finally:
+            renewer.cancel()
+            try:
+                await renewer
+            except asyncio.CancelledError:
+                pass
+            for key in list(self._held):
+                await self.db.release_lease(key, self.owner)
+            self._held.clear()
+        return self.stats()
+
+    async def _work(self, once: bool) -> None:
+        while not self._stopping.is_set():
+            try:
+                product = await self.db.claim_product(self.owner, self.lease, self.interval)
+            except Exception as e:
+                print(f"❌ Error claiming product: {str(e)}")
+                product = None
+
+            if product is None:
+                if once:
+                    return
+                # Nothing due; wake early on stop()
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(product)
+
+    async def _process(self, product: Dict) -> None:
+        key = product.get('key')
+        if key is None:
+            # Predates product keys; its lease runs out and migrate_keys fixes it
+            print(f"⚠️ Skipping {product.get('url')}: no product key, run python -m database.migrate_keys")
+            self._stats['skipped'] += 1
+            return
+        self._held[key] = product['url']
+        self._stats['claimed'] += 1
+        retry_after = None
+        try:
+            try:
+                scraper, url = resolve(product['url'])
+            except ValueError:
+                self._stats['skipped'] += 1
+                retry_after = self.interval
+                return
+
+            try:
+                async with self._domain(site_for(url)):
+                    price = await scraper.get_price(url)
+                await self.db.update_price(url, price)
+                self._stats['scraped'] += 1
+            except Exception as e:
+                print(f"Error refreshing {url}: {str(e)}")
+                self._stats['failed'] += 1
+                retry_after = self.retry_after
+        finally:
+            self._held.pop(key, None)
+            await self.db.release_lease(key, self.owner, retry_after)
+
+    def _domain(self, site: str) -> asyncio.Semaphore:
+        if site not in self._domains:
+            self._domains[site] = asyncio.Semaphore(self.per_domain)
+        return self._domains[site]
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            keys = list(self._held)
+            try:
+                held = await self.db.renew_leases(self.owner, keys, self.lease)
+            except Exception as e:
+                print(f"❌ Error renewing leases: {str(e)}")
+                continue
+            if held < len(keys):
+                # Expired before renewal (e.g. a long stall); another worker may have it
+                self._stats['lost'] += len(keys) - held
+                print(f"⚠️ Lost {len(keys) - held} product leases")
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta
+import mongomock_motor
+from database.db import Database
+from worker import scrape_worker
+from worker.scrape_worker import ScrapeWorker
+
+HOUR = timedelta(hours=1)
+
+def url(index):
+    return f'https://www.amazon.in/dp/B{index:09d}'
+
+async def make_db(count):
+    db = Database(client=mongomock_motor.AsyncMongoMockClient())
+    for index in range(count):
+        await db.add_tracked_product(url(index), f'Product {index}', 50, 100)
+    await db.products.update_many({}, {'$set': {'last_checked': datetime.utcnow() - timedelta(days=1)}})
+    return db
+
+class FakeScraper:
+    def __init__(self, fail=(), delay=0):
+        self.fail = set(fail)
+        self.delay = delay
+        self.scraped = []
+        self.active = self.max_active = 0
+
+    async def get_price(self, url):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        if url in self.fail:
+            raise RuntimeError('blocked')
+        self.scraped.append(url)
+        return 90.0
+
+def test_claims_are_exclusive_and_honour_interval_and_expiry():
+    async def run():
+        db = await make_db(3)
+        await db.products.update_one({'key': 'amazon.in/B000000002'}, {'$set': {'last_checked': datetime.utcnow()}})
+        first = await db.claim_product('a', timedelta(minutes=5), HOUR)
+        second = await db.claim_product('b', timedelta(minutes=5), HOUR)
+        # The third product was checked within the interval
+        third = await db.claim_product('c', timedelta(minutes=5), HOUR)
+
+        held = await db.renew_leases('a', [first['key'], second['key']], timedelta(minutes=5))
+        await db.release_lease(first['key'], 'b')  # not b's lease: no-op
+        after_wrong_release = await db.claim_product('c', timedelta(minutes=5), HOUR)
+
+        # b crashed: its lease runs out and c picks the product up
+        expired = datetime.utcnow() - timedelta(seconds=1)
+        await db.products.update_one({'key': second['key']}, {'$set': {'lease_expires': expired}})
+        reclaimed = await db.claim_product('c', timedelta(minutes=5), HOUR)
+
+        await db.release_lease(first['key'], 'a', retry_after=timedelta(minutes=10))
+        held_back = await db.claim_product('d', timedelta(minutes=5), HOUR)
+        await db.release_lease(reclaimed['key'], 'c')
+        released = await db.products.find_one({'key': reclaimed['key']})
+        return first, second, third, held, after_wrong_release, reclaimed, held_back, released
+
+    first, second, third, held, after_wrong_release, reclaimed, held_back, released = asyncio.run(run())
+    assert {first['key'], second['key']} == {'amazon.in/B000000000', 'amazon.in/B000000001'}
+    assert first['lease_owner'] == 'a' and second['lease_owner'] == 'b'
+    assert third is None
+    assert held == 1
+    assert after_wrong_release is None
+    assert reclaimed['key'] == second['key'] and reclaimed['lease_owner'] == 'c'
+    assert held_back is None
+    assert 'lease_owner' not in released and 'lease_expires' not in released
+
+def test_workers_never_scrape_a_product_twice(monkeypatch):
+    scraper = FakeScraper()
+    monkeypatch.setattr(scrape_worker, 'resolve', lambda url: (scraper, url))
+
+    async def run():
+        db = await make_db(30)
+        workers = [ScrapeWorker(db, owner=f'w{i}', interval=HOUR, concurrency=4) for i in range(3)]
+        stats = await asyncio.gather(*(w.run_once() for w in workers))
+        return db, stats, await db.products.count_documents({'lease_owner': {'$exists': True}})
+
+    db, stats, leased = asyncio.run(run())
+    assert sorted(scraper.scraped) == sorted(url(i) for i in range(30))
+    assert sum(s['scraped'] for s in stats) == 30
+    assert leased == 0
+
+def test_run_once_is_concurrent_and_renews_leases(monkeypatch):
+    scraper = FakeScraper(delay=0.3)
+    monkeypatch.setattr(scrape_worker, 'resolve', lambda url: (scraper, url))
+
+    async def run():
+        db = await make_db(4)
+        # Scrapes outlast the lease, so only renewal keeps the products
+        worker = ScrapeWorker(db, owner='w', interval=HOUR, concurrency=4, lease=timedelta(seconds=0.15))
+        task = asyncio.create_task(worker.run_once())
+        await asyncio.sleep(0.25)
+        rival = await db.claim_product('rival', timedelta(minutes=5), HOUR)
+        return await task, rival
+
+    stats, rival = asyncio.run(run())
+    assert scraper.max_active == 4
+    assert rival is None
+    assert stats['scraped'] == 4 and stats['lost'] == 0
+
+def test_failed_scrape_backs_off(monkeypatch):
+    scraper = FakeScraper(fail={url(0)})
+    monkeypatch.setattr(scrape_worker, 'resolve', lambda url: (scraper, url))
+
+    async def run():
+        db = await make_db(1)
+        worker = ScrapeWorker(db, owner='w', interval=HOUR, retry_after=timedelta(minutes=15))
+        stats = await worker.run_once()
+        again = await db.claim_product('other', timedelta(minutes=5), HOUR)
+        return stats, again, await db.products.find_one({})
+
+    stats, again, product = asyncio.run(run())
+    assert stats['failed'] == 1 and stats['claimed'] == 1
+    assert again is None
+    assert product['lease_expires'] > datetime.utcnow() + timedelta(minutes=14)
+
+def test_unkeyed_product_is_skipped(monkeypatch):
+    scraper = FakeScraper()
+    monkeypatch.setattr(scrape_worker, 'resolve', lambda url: (scraper, url))
+
+    async def run():
+        db = await make_db(0)
+        worker = ScrapeWorker(db, owner='w', interval=HOUR)
+        await worker._process({'url': url(0), 'is_active': True})
+        return worker.stats()
+
+    stats = asyncio.run(run())
+    assert scraper.scraped == []
+    assert stats['skipped'] == 1
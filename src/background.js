@@ -42,40 +42,84 @@ async function addProductToTrack(url, threshold) {
 // Periodically monitor all tracked products
 function startPriceMonitoring(trackedProducts) {
   // First-time check
-  Object.values(trackedProducts).forEach((product) => {
-    checkPrice(product.url, product.threshold);
-  });
+  checkPrices(Object.values(trackedProducts));
 
   // Then interval checks
   setInterval(() => {
-    Object.values(trackedProducts).forEach((product) => {
-      checkPrice(product.url, product.threshold);
-    });
+    checkPrices(Object.values(trackedProducts));
   }, CHECK_INTERVAL);
 }
 
+// Fetch prices for all products in one batch request
+async function checkPrices(products) {
+  if (!products.length) return;
+
+  const thresholds = {};
+  products.forEach((product) => {
+    thresholds[product.url] = product.threshold;
+  });
+
+  try {
+    const response = await fetch('http://localhost:8000/api/prices', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ urls: Object.keys(thresholds) }),
+    });
+
+    // The backend streams one JSON object per line as each price is ready
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split('\n');
+      buffered = lines.pop();
+
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const result = JSON.parse(line);
+        if (result.error) {
+          console.error(`Error checking price for ${result.url}:`, result.error);
+          continue;
+        }
+        await handlePrice(result.url, result.price, thresholds[result.url]);
+      }
+    }
+  } catch (error) {
+    console.error('Error checking prices:', error);
+  }
+}
+
 // Fetch current price and notify if below threshold
 async function checkPrice(url, threshold) {
   try {
     const response = await fetch(`http://localhost:8000/api/price?url=${encodeURIComponent(url)}`);
     const { price } = await response.json();
-
-    if (price <= threshold) {
-      chrome.notifications.create({
-        type: 'basic',
-        iconUrl: '/icons/icon128.png',
-        title: 'Price Alert!',
-        message: `The price has dropped to $${price}! Click to view the product.`,
-      });
-
-      const { trackedProducts } = await chrome.storage.local.get(['trackedProducts']);
-      if (trackedProducts[url]) {
-        trackedProducts[url].lastChecked = Date.now();
-        await chrome.storage.local.set({ trackedProducts });
-      }
-    }
+    await handlePrice(url, price, threshold);
   } catch (error) {
     console.error('Error checking price:', error);
   }
 }
 
+// Notify if the price is at or below the threshold
+async function handlePrice(url, price, threshold) {
+  if (price <= threshold) {
+    chrome.notifications.create({
+      type: 'basic',
+      iconUrl: '/icons/icon128.png',
+      title: 'Price Alert!',
+      message: `The price has dropped to $${price}! Click to view the product.`,
+    });
+
+    const { trackedProducts } = await chrome.storage.local.get(['trackedProducts']);
+    if (trackedProducts[url]) {
+      trackedProducts[url].lastChecked = Date.now();
+      await chrome.storage.local.set({ trackedProducts });
+    }
+  }
+}
+
@@ -30,6 +30,9 @@ ChartJS.register(
   Legend
 );
 
+// Maximum number of points drawn in the chart
+const CHART_POINTS = 200;
+
 const PriceHistory = () => {
   const [priceHistory, setPriceHistory] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -42,16 +45,17 @@ const PriceHistory = () => {
         const tabs = await chrome.tabs.query({ active: true, currentWindow: true });
         if (!tabs[0].url) throw new Error('No URL found');
 
+        // Ask the backend for a fixed-size, downsampled series for the chart
         const response = await fetch(
-          `http://localhost:8000/api/history?url=${encodeURIComponent(tabs[0].url)}`
+          `http://localhost:8000/api/history?url=${encodeURIComponent(tabs[0].url)}&points=${CHART_POINTS}`
         );
         if (!response.ok) throw new Error('Failed to fetch price history');
 
-        const data = await response.json();
-        setPriceHistory(data.history);
+        const history = await response.json();
+        setPriceHistory(history);
 
-        if (data.history.length > 0) {
-          const prices = data.history.map((point) => point.price);
+        if (history.length > 0) {
+          const prices = history.map((point) => point.price);
           const minPrice = Math.min(...prices);
           const maxPrice = Math.max(...prices);
           const avgPrice = prices.reduce((a, b) => a + b, 0) / prices.length;